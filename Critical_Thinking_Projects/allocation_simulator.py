@@ -0,0 +1,340 @@
+import csv
+import time
+import heapq
+import random
+import argparse
+from bisect import bisect_left, insort
+from module4_ct import CapacityTree
+
+SAMPLE_EVERY = 1000  # events between fragmentation samples
+
+
+# Blocks work like in module4_ct.first_fit: a process takes part of one block's capacity,
+# and freeing it gives that capacity back. Every allocator hands out a handle from
+# allocate(size) (None when nothing fits) and takes it back in release(handle).
+class FirstFit:
+
+    def __init__(self, block_sizes):
+        self.tree = CapacityTree(block_sizes)
+        self.free_memory = sum(block_sizes)
+
+    def _find(self, size):
+        return self.tree.leftmost(size)
+
+    def allocate(self, size):
+        bid = self._find(size)
+        if bid == -1:
+            return None
+        self.tree.update(bid, self.tree[bid] - size)
+        self.free_memory -= size
+        return bid, size
+
+    def release(self, handle):
+        bid, size = handle
+        self.tree.update(bid, self.tree[bid] + size)
+        self.free_memory += size
+
+    def block_of(self, handle):
+        return handle[0]
+
+    def largest_free(self):
+        return max(self.tree.max(), 0)
+
+    def remaining(self):
+        return [self.tree[bid] for bid in range(self.tree.count)]
+
+
+# Like first fit, but the search starts at the block that took the previous process
+# and wraps around to the beginning
+class NextFit(FirstFit):
+
+    def __init__(self, block_sizes):
+        super().__init__(block_sizes)
+        self.last = 0
+
+    def _find(self, size):
+        bid = self.tree.leftmost(size, self.last)
+        if bid == -1:
+            bid = self.tree.leftmost(size)
+        if bid != -1:
+            self.last = bid
+        return bid
+
+
+# The block with the most capacity left (lowest index on ties)
+class WorstFit(FirstFit):
+
+    def _find(self, size):
+        largest = self.tree.max()
+        return self.tree.leftmost(largest) if largest >= size else -1
+
+
+# The block with the least capacity that still fits (lowest index on ties),
+# found by bisecting a list of (capacity, block) kept sorted
+class BestFit:
+
+    def __init__(self, block_sizes):
+        self.capacity = list(block_sizes)
+        self.sorted = sorted((capacity, bid) for bid, capacity in enumerate(block_sizes))
+        self.free_memory = sum(block_sizes)
+
+    def _resize(self, bid, capacity):
+        del self.sorted[bisect_left(self.sorted, (self.capacity[bid], bid))]
+        insort(self.sorted, (capacity, bid))
+        self.capacity[bid] = capacity
+
+    def allocate(self, size):
+        i = bisect_left(self.sorted, (size, -1))
+        if i == len(self.sorted):
+            return None
+        capacity, bid = self.sorted[i]
+        self._resize(bid, capacity - size)
+        self.free_memory -= size
+        return bid, size
+
+    def release(self, handle):
+        bid, size = handle
+        self._resize(bid, self.capacity[bid] + size)
+        self.free_memory += size
+
+    def block_of(self, handle):
+        return handle[0]
+
+    def largest_free(self):
+        return max(self.sorted[-1][0], 0) if self.sorted else 0
+
+    def remaining(self):
+        return list(self.capacity)
+
+
+# Binary buddy allocator. Every block is cut into aligned power-of-two chunks (600 ->
+# 512 + 64 + 16 + 8), requests are rounded up to a power of two, chunks are split on the
+# way down and merged with their buddy (offset XOR size) when both halves are free.
+class Buddy:
+
+    def __init__(self, block_sizes):
+        self.bases = []
+        self.free_lists = {}  # order -> heap of free chunk addresses (lowest address first)
+        self.free_chunks = set()  # (address, order) that are really free, heaps are cleaned lazily
+        self.allocated = [0] * len(block_sizes)
+        self.block_sizes = list(block_sizes)
+        self.free_memory = 0
+        self.requested = 0
+        address = 0
+        for bid, capacity in enumerate(block_sizes):
+            self.bases.append(address)
+            offset = 0
+            for order in range(max(capacity, 1).bit_length() - 1, -1, -1):
+                if capacity - offset >= 1 << order:
+                    self._push(address + offset, order)
+                    offset += 1 << order
+            address += capacity
+        self.free_memory = sum(block_sizes)
+
+    def _push(self, address, order):
+        self.free_chunks.add((address, order))
+        heapq.heappush(self.free_lists.setdefault(order, []), address)
+
+    def _pop(self, order):
+        heap = self.free_lists.get(order)
+        while heap:
+            address = heapq.heappop(heap)
+            if (address, order) in self.free_chunks:
+                self.free_chunks.remove((address, order))
+                return address
+        return None
+
+    def _block(self, address):
+        return bisect_left(self.bases, address + 1) - 1
+
+    def allocate(self, size):
+        want = max(size - 1, 0).bit_length()  # smallest order with 1 << order >= size
+        for order in sorted(o for o in self.free_lists if o >= want):
+            address = self._pop(order)
+            if address is None:
+                continue
+            # split down to the requested order, the upper halves stay free
+            while order > want:
+                order -= 1
+                self._push(address + (1 << order), order)
+            bid = self._block(address)
+            self.allocated[bid] += 1 << want
+            self.free_memory -= 1 << want
+            self.requested += size
+            return bid, address, want, size
+        return None
+
+    def release(self, handle):
+        bid, address, order, size = handle
+        self.allocated[bid] -= 1 << order
+        self.free_memory += 1 << order
+        self.requested -= size
+        base = self.bases[bid]
+        while True:
+            buddy = (address - base) ^ (1 << order)
+            # a buddy past the end of the block is the next block's memory, never ours to merge
+            if buddy + (1 << order) > self.block_sizes[bid] or (base + buddy, order) not in self.free_chunks:
+                break
+            self.free_chunks.remove((base + buddy, order))
+            address = min(address, base + buddy)
+            order += 1
+        self._push(address, order)
+
+    def block_of(self, handle):
+        return handle[0]
+
+    def largest_free(self):
+        for order in sorted(self.free_lists, reverse=True):
+            heap = self.free_lists[order]
+            while heap and (heap[0], order) not in self.free_chunks:
+                heapq.heappop(heap)
+            if heap:
+                return 1 << order
+        return 0
+
+    # Space handed out beyond what was asked for (rounding up to a power of two)
+    def internal_waste(self):
+        return sum(self.allocated) - self.requested
+
+    def remaining(self):
+        return [size - used for size, used in zip(self.block_sizes, self.allocated)]
+
+
+STRATEGIES = {
+    'first': FirstFit,
+    'next': NextFit,
+    'best': BestFit,
+    'worst': WorstFit,
+    'buddy': Buddy,
+}
+
+
+# One static pass with the same signature as module4_ct.first_fit: returns the 1-based
+# block of every process (-1 if not allocated) and leaves the remaining capacities in block_sizes
+def allocate_all(strategy, block_sizes, process_sizes):
+    allocator = STRATEGIES[strategy](block_sizes)
+    allocation_list = [-1] * len(process_sizes)
+    for pid, process in enumerate(process_sizes):
+        handle = allocator.allocate(process)
+        if handle is not None:
+            allocation_list[pid] = allocator.block_of(handle) + 1
+    block_sizes[:] = allocator.remaining()
+    return allocation_list
+
+
+# External fragmentation: share of the free memory that isn't in the largest free piece
+def fragmentation(allocator):
+    if allocator.free_memory <= 0:
+        return 0.0
+    return 1 - allocator.largest_free() / allocator.free_memory
+
+
+def simulate(strategy, block_sizes, events, sample_every=SAMPLE_EVERY):
+    """
+    Replays a stream of (time, 'alloc' | 'free', pid, size) events, in time order, against one strategy.
+    Freeing a pid whose allocation failed (or never happened) is ignored.
+
+    Returns:
+        dict: Allocation counts, failure rate, mean/final fragmentation and throughput.
+    """
+    allocator = STRATEGIES[strategy](list(block_sizes))
+    live = {}
+    allocations = failures = 0
+    samples = []
+    start = time.perf_counter()
+    for count, (_, op, pid, size) in enumerate(events, 1):
+        if op == 'alloc':
+            handle = allocator.allocate(size)
+            allocations += 1
+            if handle is None:
+                failures += 1
+            else:
+                live[pid] = handle
+        else:
+            handle = live.pop(pid, None)
+            if handle is not None:
+                allocator.release(handle)
+        if count % sample_every == 0:
+            samples.append(fragmentation(allocator))
+    seconds = time.perf_counter() - start
+    return {
+        'strategy': strategy,
+        'events': len(events),
+        'allocations': allocations,
+        'failures': failures,
+        'failure_rate': failures / allocations if allocations else 0.0,
+        'mean_fragmentation': sum(samples) / len(samples) if samples else fragmentation(allocator),
+        'final_fragmentation': fragmentation(allocator),
+        'internal_waste': allocator.internal_waste() if isinstance(allocator, Buddy) else 0,
+        'seconds': seconds,
+        'events_per_s': len(events) / seconds if seconds else float('inf'),
+    }
+
+
+def generate_events(count, seed=507, mean_size=300, mean_lifetime=2000.0, arrival_rate=1.0):
+    """
+    Random workload: Poisson arrivals of processes with uniform sizes and exponential lifetimes.
+    Returns count events sorted by time, every free comes after its alloc.
+    """
+    rng = random.Random(seed)
+    events = []
+    frees = []  # heap of (time, pid)
+    now = 0.0
+    pid = 0
+    while len(events) < count:
+        now += rng.expovariate(arrival_rate)
+        while frees and frees[0][0] <= now and len(events) < count:
+            free_time, free_pid = heapq.heappop(frees)
+            events.append((free_time, 'free', free_pid, 0))
+        if len(events) < count:
+            size = rng.randint(1, 2 * mean_size)
+            events.append((now, 'alloc', pid, size))
+            heapq.heappush(frees, (now + rng.expovariate(1 / mean_lifetime), pid))
+            pid += 1
+    return events
+
+
+def load_events(path):
+    """Reads a time,op,pid,size CSV (with header) and sorts it by time."""
+    with open(path, newline='') as f:
+        reader = csv.DictReader(f)
+        events = [(float(row['time']), row['op'], int(row['pid']), int(row['size'] or 0)) for row in reader]
+    events.sort(key=lambda event: event[0])  # stable, so ties keep file order
+    return events
+
+
+def save_events(path, events):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['time', 'op', 'pid', 'size'])
+        writer.writerows(events)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay allocate/free events against several placement strategies.")
+    parser.add_argument('--trace', help="time,op,pid,size CSV to replay (default: a generated workload)")
+    parser.add_argument('--events', type=int, default=1_000_000, help="events to generate")
+    parser.add_argument('--blocks', type=int, default=1000, help="number of memory blocks")
+    parser.add_argument('--seed', type=int, default=507)
+    parser.add_argument('--strategies', nargs='+', choices=sorted(STRATEGIES), default=list(STRATEGIES))
+    parser.add_argument('--save-trace', help="write the generated events to this CSV")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    block_sizes = [rng.randint(100, 1000) for _ in range(args.blocks)]
+    events = load_events(args.trace) if args.trace else generate_events(args.events, args.seed)
+    if args.save_trace:
+        save_events(args.save_trace, events)
+
+    print(f"----CSC 507: Allocation Simulation ({len(events)} events, {len(block_sizes)} blocks)----")
+    print(f"\n{'Strategy':<10}{'Failure rate':>14}{'Mean frag':>12}{'Final frag':>12}"
+          f"{'Int. waste':>12}{'Events/s':>12}{'Seconds':>10}")
+    for strategy in args.strategies:
+        result = simulate(strategy, block_sizes, events)
+        print(f"{strategy:<10}{result['failure_rate']:>14.2%}{result['mean_fragmentation']:>12.3f}"
+              f"{result['final_fragmentation']:>12.3f}{result['internal_waste']:>12}"
+              f"{result['events_per_s']:>12,.0f}{result['seconds']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
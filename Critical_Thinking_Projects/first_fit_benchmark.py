@@ -0,0 +1,49 @@
+import time
+import random
+import argparse
+from module4_ct import first_fit, first_fit_indexed
+
+SCALES = [1_000, 10_000, 100_000, 1_000_000]  # blocks and processes per run
+LINEAR_LIMIT = 10_000  # the O(P*B) scan is skipped above this (30k blocks already takes ~20s)
+
+
+# Random blocks and processes; processes are drawn a bit larger on average than the blocks
+# so some don't fit anywhere (the worst case for the linear scan)
+def make_workload(count, seed):
+    rng = random.Random(seed)
+    block_sizes = [rng.randint(50, 1000) for _ in range(count)]
+    process_sizes = [rng.randint(10, 1200) for _ in range(count)]
+    return block_sizes, process_sizes
+
+
+# Runs one allocator on a fresh copy of the blocks, returns (seconds, allocation, blocks left)
+def time_allocator(allocator, block_sizes, process_sizes):
+    blocks = list(block_sizes)
+    start = time.perf_counter()
+    allocation = allocator(blocks, process_sizes)
+    return time.perf_counter() - start, allocation, blocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare linear and segment-tree first fit.")
+    parser.add_argument('--scales', type=int, nargs='+', default=SCALES)
+    parser.add_argument('--linear-limit', type=int, default=LINEAR_LIMIT,
+                        help="largest scale to also run the linear first_fit on")
+    parser.add_argument('--seed', type=int, default=507)
+    args = parser.parse_args()
+
+    print(f"{'Blocks':>10}{'Linear (s)':>14}{'Indexed (s)':>14}{'Speedup':>10}")
+    for count in args.scales:
+        block_sizes, process_sizes = make_workload(count, args.seed)
+        indexed, allocation, blocks = time_allocator(first_fit_indexed, block_sizes, process_sizes)
+        if count > args.linear_limit:
+            print(f"{count:>10}{'skipped':>14}{indexed:>14.3f}{'':>10}")
+            continue
+        linear, expected, expected_blocks = time_allocator(first_fit, block_sizes, process_sizes)
+        # both must hand out exactly the same blocks
+        assert allocation == expected and blocks == expected_blocks, f"allocations differ at {count} blocks"
+        print(f"{count:>10}{linear:>14.3f}{indexed:>14.3f}{linear / indexed:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
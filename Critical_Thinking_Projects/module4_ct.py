@@ -18,6 +18,77 @@ def first_fit(block_sizes, process_sizes):
     return allocation_list
 
 
+# Array-based max segment tree over block capacities. Leaves start at index size (a power
+# of two), node i covers children 2i and 2i+1. Padding leaves hold -1 so they never fit,
+# not even a process of size 0
+class CapacityTree:
+
+    def __init__(self, capacities):
+        self.count = len(capacities)
+        self.size = 1
+        while self.size < self.count:
+            self.size *= 2
+        self.tree = [-1] * (2 * self.size)
+        self.tree[self.size:self.size + self.count] = capacities
+        for node in range(self.size - 1, 0, -1):
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+
+    # Largest capacity left in any block
+    def max(self):
+        return self.tree[1] if self.count else -1
+
+    def __getitem__(self, bid):
+        return self.tree[self.size + bid]
+
+    # Lowest block index >= start with capacity >= need, or -1. O(log B)
+    def leftmost(self, need, start=0):
+        tree = self.tree
+        if start >= self.count:
+            return -1
+        node = 1 if start == 0 else start + self.size
+        # climb until a subtree at or right of start can take it ...
+        while tree[node] < need:
+            while node & 1:
+                node >>= 1
+            if not node:
+                return -1
+            node += 1
+        # ... then walk down, preferring the left child whenever it still fits
+        while node < self.size:
+            node *= 2
+            if tree[node] < need:
+                node += 1
+        return node - self.size
+
+    # Set one block's capacity and fix every max above it. O(log B)
+    def update(self, bid, capacity):
+        tree = self.tree
+        node = bid + self.size
+        tree[node] = capacity
+        node >>= 1
+        while node:
+            value = max(tree[2 * node], tree[2 * node + 1])
+            if tree[node] == value:
+                break  # nothing above changes either
+            tree[node] = value
+            node >>= 1
+
+
+# Same allocation as first_fit, but the leftmost block that fits is found through a
+# CapacityTree: O(log B) per process instead of scanning every block
+def first_fit_indexed(block_sizes, process_sizes):
+
+    allocation_list = [-1] * len(process_sizes)
+    tree = CapacityTree(block_sizes)
+    for pid, process in enumerate(process_sizes):
+        bid = tree.leftmost(process)
+        if bid != -1:
+            allocation_list[pid] = bid + 1
+            block_sizes[bid] -= process
+            tree.update(bid, block_sizes[bid])
+    return allocation_list
+
+
 # Main function
 def main():
 
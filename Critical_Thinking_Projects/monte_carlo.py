@@ -0,0 +1,182 @@
+import math
+import time
+import argparse
+from multiprocessing import Pool, cpu_count
+import numpy as np
+from allocation_simulator import STRATEGIES, allocate_all
+
+BATCH_SCENARIOS = 500  # scenarios generated and evaluated together by one worker task
+VECTORIZED = ('first', 'next', 'best', 'worst')  # strategies with an array version below
+
+# Scenario parameters: counts per scenario and the uniform size ranges (inclusive)
+DEFAULT_PARAMS = {
+    'blocks': 5,
+    'processes': 6,
+    'block_low': 100,
+    'block_high': 600,
+    'process_low': 50,
+    'process_high': 350,
+}
+
+
+def generate_scenarios(seed, batch, count, params):
+    """
+    Block and process sizes for one batch of scenarios, as (count, blocks) and
+    (count, processes) arrays. The batch number is part of the seed, so a run gives the
+    same scenarios for a seed whatever the worker count.
+    """
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(batch,)))
+    blocks = rng.integers(params['block_low'], params['block_high'], (count, params['blocks']), endpoint=True)
+    processes = rng.integers(params['process_low'], params['process_high'], (count, params['processes']),
+                             endpoint=True)
+    return blocks, processes
+
+
+def allocate_vectorized(strategy, blocks, processes):
+    """
+    Runs one placement strategy over many scenarios at once: every step places process j
+    of all scenarios together. blocks is copied, the caller's arrays are left alone.
+
+    Returns:
+        numpy.ndarray: (scenarios, processes) 1-based block numbers, -1 where nothing fit.
+    """
+    capacity = blocks.astype(np.int64)
+    rows = np.arange(len(capacity))
+    columns = np.arange(capacity.shape[1])
+    allocation = np.full(processes.shape, -1, dtype=np.int64)
+    last = np.zeros(len(capacity), dtype=np.int64)  # next fit: block that took the previous process
+
+    for j in range(processes.shape[1]):
+        need = processes[:, j]
+        fits = capacity >= need[:, None]
+        if strategy == 'first':
+            bid = fits.argmax(axis=1)
+        elif strategy == 'next':
+            ahead = fits & (columns >= last[:, None])
+            bid = np.where(ahead.any(axis=1), ahead.argmax(axis=1), fits.argmax(axis=1))
+        elif strategy == 'best':
+            bid = np.where(fits, capacity, np.iinfo(np.int64).max).argmin(axis=1)
+        elif strategy == 'worst':
+            bid = np.where(fits, capacity, -1).argmax(axis=1)
+        else:
+            raise ValueError(f"no vectorized version of {strategy!r}")
+        placed = fits[rows, bid]
+        capacity[rows[placed], bid[placed]] -= need[placed]
+        allocation[placed, j] = bid[placed] + 1
+        last = np.where(placed, bid, last)
+    return allocation
+
+
+def allocate_python(strategy, blocks, processes):
+    """Same result as allocate_vectorized, one scenario at a time through allocate_all (works for buddy)."""
+    allocation = np.full(processes.shape, -1, dtype=np.int64)
+    for i, (block_sizes, process_sizes) in enumerate(zip(blocks.tolist(), processes.tolist())):
+        allocation[i] = allocate_all(strategy, block_sizes, process_sizes)  # block_sizes is a fresh list
+    return allocation
+
+
+# Per-scenario statistics: share of processes left unallocated, share of block memory handed out
+def scenario_stats(blocks, processes, allocation):
+    placed = allocation != -1
+    failure_rate = 1 - placed.mean(axis=1)
+    utilization = (processes * placed).sum(axis=1) / blocks.sum(axis=1)
+    return {'failure_rate': failure_rate, 'utilization': utilization}
+
+
+# (count, mean, M2) of one batch, merged into the running totals in the parent
+def summarize(values):
+    mean = float(values.mean())
+    return len(values), mean, float(((values - mean) ** 2).sum())
+
+
+def merge(total, part):
+    """Chan et al. pairwise update of (count, mean, M2), so batches can arrive in any order."""
+    n1, mean1, m2_1 = total
+    n2, mean2, m2_2 = part
+    n = n1 + n2
+    delta = mean2 - mean1
+    return n, mean1 + delta * n2 / n, m2_1 + m2_2 + delta * delta * n1 * n2 / n
+
+
+def run_batch(task):
+    """Worker: generate one batch of scenarios and evaluate every strategy on it."""
+    seed, batch, count, params, strategies, vectorized = task
+    blocks, processes = generate_scenarios(seed, batch, count, params)
+    results = {}
+    for strategy in strategies:
+        if vectorized and strategy in VECTORIZED:
+            allocation = allocate_vectorized(strategy, blocks, processes)
+        else:
+            allocation = allocate_python(strategy, blocks, processes)
+        stats = scenario_stats(blocks, processes, allocation)
+        results[strategy] = {metric: summarize(values) for metric, values in stats.items()}
+    return results
+
+
+def monte_carlo(scenarios, seed=507, strategies=tuple(STRATEGIES), params=None, workers=None,
+                batch_scenarios=BATCH_SCENARIOS, vectorized=True):
+    """
+    Runs randomized allocation scenarios across a process pool and aggregates them as they finish.
+
+    Args:
+        scenarios (int): Number of scenarios in total.
+        seed (int): Same seed, same scenarios (also with a different worker count).
+        strategies (tuple): Names from allocation_simulator.STRATEGIES.
+        params (dict): Overrides for DEFAULT_PARAMS.
+        workers (int): Worker processes, defaults to cpu_count().
+        batch_scenarios (int): Scenarios per worker task.
+        vectorized (bool): Evaluate first/next/best/worst fit with NumPy across the whole batch.
+
+    Returns:
+        dict: strategy -> metric -> {'mean', 'std', 'ci95'} over all scenarios.
+    """
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+    batches = math.ceil(scenarios / batch_scenarios)
+    tasks = [(seed, batch, min(batch_scenarios, scenarios - batch * batch_scenarios), params,
+              tuple(strategies), vectorized) for batch in range(batches)]
+
+    totals = {}
+    with Pool(processes=min(workers or cpu_count(), max(1, batches))) as pool:
+        for result in pool.imap_unordered(run_batch, tasks):
+            for strategy, metrics in result.items():
+                for metric, part in metrics.items():
+                    key = (strategy, metric)
+                    totals[key] = merge(totals[key], part) if key in totals else part
+
+    report = {}
+    for (strategy, metric), (n, mean, m2) in totals.items():
+        std = math.sqrt(m2 / (n - 1)) if n > 1 else 0.0
+        report.setdefault(strategy, {})[metric] = {'mean': mean, 'std': std, 'ci95': 1.96 * std / math.sqrt(n)}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo comparison of placement strategies.")
+    parser.add_argument('--scenarios', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=507)
+    parser.add_argument('--strategies', nargs='+', choices=sorted(STRATEGIES), default=list(STRATEGIES))
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--batch', type=int, default=BATCH_SCENARIOS, help="scenarios per worker task")
+    parser.add_argument('--python', action='store_true', help="skip the vectorized NumPy path")
+    for name, value in DEFAULT_PARAMS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=value)
+    args = parser.parse_args()
+
+    params = {name: getattr(args, name) for name in DEFAULT_PARAMS}
+    start = time.time()
+    report = monte_carlo(args.scenarios, args.seed, args.strategies, params, args.workers, args.batch,
+                         not args.python)
+    end = time.time()
+
+    print(f"----CSC 507: {args.scenarios} scenarios, {params['blocks']} blocks, {params['processes']} processes----")
+    print(f"\n{'Strategy':<10}{'Failure rate':>22}{'Utilization':>22}")
+    for strategy in args.strategies:
+        failure = report[strategy]['failure_rate']
+        utilization = report[strategy]['utilization']
+        print(f"{strategy:<10}{failure['mean']:>13.2%} ± {failure['ci95']:<6.2%}"
+              f"{utilization['mean']:>13.2%} ± {utilization['ci95']:<6.2%}")
+    print(f"\nProcessing took {end - start:.2f} seconds")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import math
+import time
+from array import array
+
+DOMAIN_MAX = 100000  # pynumbers.py draws from randint(1, 100000)
+
+_table = None  # filled on first use, index n holds add_cpu_load(n)
+
+
+# add_cpu_load to add some computational overhead
+def add_cpu_load(number):
+    result = 0
+    for i in range(10):
+        result += math.ceil(math.sqrt(number) * math.log(number))
+    return result
+
+
+def _build_table():
+    global _table
+    # Same math calls as add_cpu_load so every entry matches it exactly; slot 0 is unused
+    _table = array('q', [0])
+    _table.extend(10 * math.ceil(math.sqrt(n) * math.log(n)) for n in range(1, DOMAIN_MAX + 1))
+    return _table
+
+
+def cached_cpu_load(number):
+    """add_cpu_load as a table lookup, computed directly for values outside 1..DOMAIN_MAX."""
+    table = _table or _build_table()
+    if 0 < number <= DOMAIN_MAX:
+        return table[number]
+    return add_cpu_load(number)
+
+
+def cpu_load_array(numbers):
+    """Vectorized add_cpu_load for a whole NumPy chunk: one gather for in-range values."""
+    import numpy as np
+
+    table = np.frombuffer(_table or _build_table(), dtype=np.int64)
+    numbers = np.asarray(numbers, dtype=np.int64)
+    in_range = (numbers > 0) & (numbers <= DOMAIN_MAX)
+    result = table[np.where(in_range, numbers, 0)]
+    for i in np.flatnonzero(~in_range):
+        result[i] = add_cpu_load(int(numbers[i]))
+    return result
+
+
+def main():
+    import random
+    import numpy as np
+
+    numbers = [random.randint(1, DOMAIN_MAX) for _ in range(1_000_000)]
+
+    start = time.time()
+    expected = [add_cpu_load(n) for n in numbers]
+    per_call = time.time() - start
+
+    start = time.time()
+    _build_table()
+    build = time.time() - start
+
+    start = time.time()
+    cached = [cached_cpu_load(n) for n in numbers]
+    lookup = time.time() - start
+
+    as_array = np.array(numbers, dtype=np.int64)
+    start = time.time()
+    vectorized = cpu_load_array(as_array)
+    gather = time.time() - start
+
+    assert cached == expected and vectorized.tolist() == expected
+    print(f"{len(numbers)} numbers")
+    print(f"Per-call add_cpu_load took {per_call:.2f} seconds")
+    print(f"Building the table took {build:.2f} seconds")
+    print(f"Table lookup took {lookup:.2f} seconds")
+    print(f"NumPy gather took {gather:.4f} seconds")
+
+
+if __name__ == '__main__':
+    main()
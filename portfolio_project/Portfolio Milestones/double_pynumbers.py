@@ -60,7 +60,7 @@ def split_file():
     # Process both split files and write results
     doubled = []
 
-    for part_file in ['file_part1.txt', 'file_part2.txt']:
+    for part_file in ['../file_part1.txt', '../file_part2.txt']:
         with open(part_file, 'r') as f:
             for line in f:
                 stripped = line.strip()
@@ -1,13 +1,8 @@
 import time
-import math
+from cpu_load import add_cpu_load, cached_cpu_load
 
-
-# add_cpu_load to add some computational overhead
-def add_cpu_load(number):
-    result = 0
-    for i in range(10):
-        result += math.ceil(math.sqrt(number) * math.log(number))
-    return result
+USE_LOOKUP_TABLE = True  # Look up add_cpu_load results instead of recomputing them (see cpu_load.py)
+cpu_load = cached_cpu_load if USE_LOOKUP_TABLE else add_cpu_load
 
 
 # Method to read entire file into memory before processing it
@@ -22,7 +17,7 @@ def read_all():
         stripped = line.strip()
         if stripped:
             number = int(stripped)
-            add_me = add_cpu_load(number)
+            add_me = cpu_load(number)
             result = (number * 2) + add_me
             doubled.append(str(result))
     # Write file
@@ -40,7 +35,7 @@ def line_by_line():
             stripped = line.strip()
             if stripped:
                 number = int(stripped)
-                add_me = add_cpu_load(number)
+                add_me = cpu_load(number)
                 result = (number * 2) + add_me
                 outfile.write(str(result) + '\n')
 
@@ -71,13 +66,13 @@ def split_file():
     # Process both split files and write results
     doubled = []
 
-    for part_file in ['file_part1.txt', 'file_part2.txt']:
+    for part_file in ['../file_part1.txt', '../file_part2.txt']:
         with open(part_file, 'r') as f:
             for line in f:
                 stripped = line.strip()
                 if stripped:
                     number = int(stripped)
-                    add_me = add_cpu_load(number)
+                    add_me = cpu_load(number)
                     result = (number * 2) + add_me
                     doubled.append(str(result))
 
@@ -1,21 +1,23 @@
 import multiprocessing
 import time
-import math
-from multiprocessing import Pool, cpu_count
+from collections import deque
+from multiprocessing import Pool, cpu_count, shared_memory
+from cpu_load import add_cpu_load, cached_cpu_load
+from project_helpers import tracing
 
 CHUNKS = 20  # You can change this to 2, 5, 20 etc.
 
+STREAMING = True  # Bounded-memory pipeline instead of reading the whole file into a list
+BLOCK_BYTES = 4 * 1024 * 1024  # approximate size of each block handed to a worker
+MAX_IN_FLIGHT = 2 * cpu_count()  # blocks submitted but not yet written
+SHARED_MEMORY = True  # Streaming mode: hand blocks over in shared memory instead of pickling them
 
-# add_cpu_load to add some computational overhead
-def add_cpu_load(number):
-    result = 0
-    for i in range(10):
-        result += math.ceil(math.sqrt(number) * math.log(number))
-
-    return result
+USE_LOOKUP_TABLE = True  # Look up add_cpu_load results instead of recomputing them (see cpu_load.py)
+cpu_load = cached_cpu_load if USE_LOOKUP_TABLE else add_cpu_load
 
 
 # Computational processing for each chunk
+@tracing.traced(profile=True)
 def process_chunk(chunk_lines):
 
     result = []
@@ -23,11 +25,154 @@ def process_chunk(chunk_lines):
         stripped = line.strip()
         if stripped:
             number = int(stripped)
-            add_me = add_cpu_load(number)
+            add_me = cpu_load(number)
             result.append(str((number * 2) + add_me))
+    tracing.count(lines_in=len(chunk_lines), lines_out=len(result))
     return result
 
 
+# Streaming version of process_chunk: one newline-joined block in, one block of results out
+def process_block(block):
+    result = process_chunk(block.split('\n'))
+    return ''.join(item + '\n' for item in result)
+
+
+# Yield blocks of whole lines, roughly block_bytes each
+def read_blocks(f, block_bytes=BLOCK_BYTES):
+    while True:
+        lines = f.readlines(block_bytes)
+        if not lines:
+            return
+        yield ''.join(lines)
+
+
+def stream_process_file(input_file='file2.txt', output_file='output_parallel2.txt',
+                        block_bytes=BLOCK_BYTES, max_in_flight=MAX_IN_FLIGHT):
+    """
+    Reads, processes and writes at the same time with a bounded number of blocks in flight.
+    Results are written in input order as soon as the oldest block is done, so memory use
+    stays flat whatever the input size.
+    """
+    pending = deque()
+    with open(input_file, 'r') as f, open(output_file, 'w') as out, Pool(processes=cpu_count()) as pool:
+        for block in read_blocks(f, block_bytes):
+            pending.append(pool.apply_async(process_block, (block,)))
+            # Window is full: wait for the oldest block and write it before reading more
+            if len(pending) >= max_in_flight:
+                out.write(pending.popleft().get())
+        while pending:
+            out.write(pending.popleft().get())
+
+
+# Worker-side cache of attached segments, so each segment is opened once per worker
+_attached = {}
+
+
+def _attach(name):
+    segment = _attached.get(name)
+    if segment is None:
+        try:
+            segment = shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+        except TypeError:
+            segment = shared_memory.SharedMemory(name=name)
+        _attached[name] = segment
+    return segment
+
+
+def process_shared_block(descriptor):
+    """
+    Worker for shm_process_file: reads length bytes of input from one segment, writes the
+    results into another and returns how many bytes it wrote. Only names and sizes are pickled.
+    """
+    in_name, length, out_name = descriptor
+    block = bytes(_attach(in_name).buf[:length]).decode()
+    result = process_block(block).encode()
+    out = _attach(out_name)
+    if len(result) > out.size:
+        raise ValueError(f"results of a {length}-byte block do not fit the {out.size}-byte output segment")
+    out.buf[:len(result)] = result
+    return len(result)
+
+
+# Read until the view is full or the file ends
+def _fill(f, view):
+    total = 0
+    while total < len(view):
+        n = f.readinto(view[total:])
+        if not n:
+            break
+        total += n
+    return total
+
+
+# Position of the last newline in segment[:end], looking backwards from the end
+def _last_newline(segment, end):
+    window = 4096
+    while True:
+        start = max(0, end - window)
+        pos = bytes(segment.buf[start:end]).rfind(b'\n')
+        if pos != -1:
+            return start + pos
+        if start == 0:
+            return -1
+        window *= 2
+
+
+def shm_process_file(input_file='file2.txt', output_file='output_parallel2.txt',
+                     block_bytes=BLOCK_BYTES, max_in_flight=MAX_IN_FLIGHT):
+    """
+    Same bounded, ordered pipeline as stream_process_file, but the file is read straight into
+    shared-memory slots and workers write results into paired output slots. Every segment
+    is unlinked on the way out, even when a worker fails.
+    """
+    slots = []
+    try:
+        for _ in range(max_in_flight):
+            # A result line is at most twice its input line (e.g. "2\n" -> "14\n")
+            slots.append((shared_memory.SharedMemory(create=True, size=block_bytes),
+                          shared_memory.SharedMemory(create=True, size=2 * block_bytes)))
+        free = deque(range(max_in_flight))
+        pending = deque()
+        carry = b''
+
+        with open(input_file, 'rb') as f, open(output_file, 'wb') as out, Pool(processes=cpu_count()) as pool:
+            def write_oldest():
+                slot, result = pending.popleft()
+                length = result.get()
+                out.write(slots[slot][1].buf[:length])
+                free.append(slot)
+
+            while True:
+                if not free:
+                    write_oldest()
+                slot = free.popleft()
+                segment = slots[slot][0]
+                segment.buf[:len(carry)] = carry
+                total = len(carry) + _fill(f, segment.buf[len(carry):])
+                if total < block_bytes:
+                    cut = total  # end of file, the last line may lack a newline
+                else:
+                    cut = _last_newline(segment, total) + 1
+                    if cut == 0:
+                        raise ValueError(f"a line in {input_file} is longer than the {block_bytes}-byte block")
+                if cut == 0:
+                    free.append(slot)
+                    break
+                carry = bytes(segment.buf[cut:total])
+                pending.append((slot, pool.apply_async(process_shared_block,
+                                                       ((segment.name, cut, slots[slot][1].name),))))
+            while pending:
+                write_oldest()
+    finally:
+        for segments in slots:
+            for segment in segments:
+                try:
+                    segment.close()
+                except BufferError:
+                    pass  # a view is still alive (error path), unlink below still frees it
+                segment.unlink()
+
+
 def parallel_process_file(input_file='file2.txt', output_file='output_parallel2.txt', chunks=CHUNKS):
     # Read all lines and split into chunks
     with open(input_file, 'r') as f:
@@ -51,9 +196,16 @@ def parallel_process_file(input_file='file2.txt', output_file='output_parallel2.
 
 def main():
 
-    print(f"{CHUNKS} processes assigned a portion of the file ...")
     start = time.time()
-    parallel_process_file()
+    if STREAMING:
+        print(f"Streaming the file through {cpu_count()} processes, {MAX_IN_FLIGHT} blocks in flight ...")
+        if SHARED_MEMORY:
+            shm_process_file()
+        else:
+            stream_process_file()
+    else:
+        print(f"{CHUNKS} processes assigned a portion of the file ...")
+        parallel_process_file()
     end = time.time()
     print(f"Completed in {end - start:.2f} seconds")
 
@@ -1,9 +1,11 @@
 import os
 import time
-import math
 import shutil
 from multiprocessing import Pool, cpu_count
 
+from cpu_load import add_cpu_load, cached_cpu_load
+from project_helpers import assemble_outputs, tracing
+
 CHUNKS = 20  # Number of split files
 
 INPUT_FILE = '../file2.txt'
@@ -11,13 +13,8 @@ SPLIT_DIR = 'splits'
 OUTPUT_DIR = 'outputs'
 FINAL_OUTPUT = 'output_parallel.txt'
 
-
-# add_cpu_load to add some computational overhead
-def add_cpu_load(number):
-    result = 0
-    for i in range(10):
-        result += math.ceil(math.sqrt(number) * math.log(number))
-    return result
+USE_LOOKUP_TABLE = True  # Look up add_cpu_load results instead of recomputing them (see cpu_load.py)
+cpu_load = cached_cpu_load if USE_LOOKUP_TABLE else add_cpu_load
 
 
 # clean up temporary outputs after script completion
@@ -30,7 +27,9 @@ def clean_dirs():
      #   os.remove(FINAL_OUTPUT)
 
 
+@tracing.traced(profile=True)
 def process_file(filename):
+    tracing.annotate(chunk=filename)
     input_path = os.path.join(SPLIT_DIR, filename)
     output_path = os.path.join(OUTPUT_DIR, f"out_{filename}")
 
@@ -41,23 +40,34 @@ def process_file(filename):
                 try:
                     number = int(stripped)
                     if number <= 0:
+                        tracing.count(skipped=1)
                         continue  # skip zero or negative values
-                    add_me = add_cpu_load(number)
+                    add_me = cpu_load(number)
                     result = (number * 2) + add_me
                     out.write(str(result) + '\n')
                 except Exception as e:
+                    tracing.count(invalid=1)
                     print(f"Error in {filename}: {e}")
+            else:
+                tracing.count(blank=1)
+    tracing.record_output(output_path, inputs=(input_path,))
     return output_path
 
 
+@tracing.traced()
 def split_file(input_file=INPUT_FILE, chunks=CHUNKS):
     with open(input_file, 'r') as f:
-        lines = [line for line in f if line.strip()]
+        all_lines = f.readlines()
+    lines = [line for line in all_lines if line.strip()]
+    blank = len(all_lines) - len(lines)  # dropped here, so process_file never sees them
+    del all_lines
 
     os.makedirs(SPLIT_DIR, exist_ok=True)
     total_lines = len(lines)
     chunk_size = (total_lines + chunks - 1) // chunks
 
+    tracing.count(bytes_in=os.path.getsize(input_file), lines_in=total_lines + blank, lines_out=total_lines,
+                  blank=blank)
     for i in range(chunks):
         chunk_lines = lines[i * chunk_size:(i + 1) * chunk_size]
         split_path = os.path.join(SPLIT_DIR, f"chunk_{i}.txt")
@@ -65,15 +75,14 @@ def split_file(input_file=INPUT_FILE, chunks=CHUNKS):
             chunk_file.writelines(chunk_lines)
 
 
+@tracing.traced()
 def combine_outputs(output_dir=OUTPUT_DIR, final_output=FINAL_OUTPUT):
-    with open(final_output, 'w') as outfile:
-        for i in range(CHUNKS):
-            output_file = os.path.join(output_dir, f"out_chunk_{i}.txt")
-            if os.path.exists(output_file):
-                with open(output_file, 'r') as f:
-                    outfile.writelines(f.readlines())
+    # Chunks are copied straight to their final offsets (see assemble.py), in chunk order
+    chunk_paths = [os.path.join(output_dir, f"out_chunk_{i}.txt") for i in range(CHUNKS)]
+    assemble_outputs([path for path in chunk_paths if os.path.exists(path)], final_output)
 
 
+@tracing.traced()
 def parallel_process_files():
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
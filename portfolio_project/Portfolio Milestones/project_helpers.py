@@ -0,0 +1,11 @@
+import os
+import sys
+
+# The milestone scripts reuse these helpers from the portfolio project scripts; importing them
+# from here keeps the one path lookup in one place
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Portfolio Project')
+if PROJECT_DIR not in sys.path:
+    sys.path.append(PROJECT_DIR)
+
+from assemble import assemble_outputs
+import tracing
@@ -1,9 +1,22 @@
+import mmap
 import time
+import operator
+import argparse
+from line_index import get_index
+from numpy_add import add_files_numpy
+from incremental import add_incremental
+
+BLOCK_BYTES = 1024 * 1024  # mapped bytes turned into lines per step (mmap mode)
+FLUSH_BYTES = 8 * 1024 * 1024  # output buffered in one bytearray until it reaches this size
 
 
 # Function to add two files together using streaming
-def add_files_streaming(input1, input2, output):
+# start_line skips straight to that row using the .idx sidecar (see line_index.py)
+def add_files_streaming(input1, input2, output, start_line=0):
     with open(input1, 'r') as f1, open(input2, 'r') as f2, open(output, 'w') as out:
+        if start_line:
+            f1.seek(get_index(input1).line_offset(input1, start_line))
+            f2.seek(get_index(input2).line_offset(input2, start_line))
         for line1, line2 in zip(f1, f2):
             val1 = line1.strip()
             val2 = line2.strip()
@@ -16,9 +29,90 @@ def add_files_streaming(input1, input2, output):
                     pass  # or log the error
 
 
+# Next run of whole lines starting at pos, about block_bytes long (one copy out of the map),
+# and the position right after it
+def _mapped_lines(mapped, pos, block_bytes):
+    end = len(mapped)
+    cut = end
+    if pos + block_bytes < end:
+        cut = mapped.rfind(b'\n', pos, pos + block_bytes) + 1
+        if cut == 0:
+            cut = mapped.find(b'\n', pos + block_bytes) + 1 or end  # one very long line
+    data = mapped[pos:cut]
+    lines = data.split(b'\n')
+    if data.endswith(b'\n'):
+        lines.pop()
+    return lines, cut
+
+
+# Same addition, but both inputs are memory-mapped and cut into blocks at newline positions:
+# no text decoding, int() runs straight on the mapped bytes, and the output is collected in
+# one bytearray that goes out in large writes
+def add_files_mmap(input1, input2, output, block_bytes=BLOCK_BYTES, flush_bytes=FLUSH_BYTES):
+    with open(input1, 'rb') as f1, open(input2, 'rb') as f2, open(output, 'wb') as out:
+        # mmap can't map an empty file, and there is nothing to add anyway
+        if not f1.seek(0, 2) or not f2.seek(0, 2):
+            return
+        with mmap.mmap(f1.fileno(), 0, access=mmap.ACCESS_READ) as m1, \
+                mmap.mmap(f2.fileno(), 0, access=mmap.ACCESS_READ) as m2:
+            pos1 = pos2 = 0
+            # Lines of the last block of each file and how many of them are used up; a block is
+            # only cut from the map once the previous one is, so uneven line lengths cost nothing extra
+            pending1, pending2 = [], []
+            used1 = used2 = 0
+            buffer = bytearray()
+            while True:
+                if used1 == len(pending1) and pos1 < len(m1):
+                    (pending1, pos1), used1 = _mapped_lines(m1, pos1, block_bytes), 0
+                if used2 == len(pending2) and pos2 < len(m2):
+                    (pending2, pos2), used2 = _mapped_lines(m2, pos2, block_bytes), 0
+                rows = min(len(pending1) - used1, len(pending2) - used2)
+                if not rows:
+                    break
+                lines1 = pending1[used1:used1 + rows]
+                lines2 = pending2[used2:used2 + rows]
+                used1 += rows
+                used2 += rows
+
+                try:
+                    # Fast path: the whole block is valid, so int()/add/str all run inside map()
+                    sums = map(operator.add, map(int, lines1), map(int, lines2))
+                    buffer += ''.join([f"{s}\n" for s in sums]).encode()
+                except ValueError:
+                    # Blank or invalid lines somewhere in the block, check them one by one
+                    for val1, val2 in zip(lines1, lines2):
+                        val1 = val1.strip()
+                        val2 = val2.strip()
+                        if val1 and val2:
+                            try:
+                                buffer += b'%d\n' % (int(val1) + int(val2))
+                            except ValueError:
+                                continue  # skip invalid lines
+                if len(buffer) >= flush_bytes:
+                    out.write(buffer)
+                    buffer.clear()
+            out.write(buffer)
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Add hugefile1.txt and hugefile2.txt line by line.")
+    parser.add_argument('--numpy', action='store_true', help="use the vectorized NumPy kernel")
+    parser.add_argument('--mmap', action='store_true', help="memory-map the inputs instead of reading text lines")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only add rows appended since the last --incremental run (see incremental.py)")
+    args = parser.parse_args()
+
     start = time.time()
-    add_files_streaming("hugefile1.txt", "hugefile2.txt", "summation.txt")
+    if args.incremental:
+        added, total, rebuilt = add_incremental("hugefile1.txt", "hugefile2.txt", "summation.txt", args.numpy,
+                                                workers=1, units=1)
+        print(f"Added {added} rows{' (rebuilt: ' + rebuilt + ')' if rebuilt else ''}, {total} rows in total")
+    elif args.numpy:
+        add_files_numpy("hugefile1.txt", "hugefile2.txt", "summation.txt")
+    elif args.mmap:
+        add_files_mmap("hugefile1.txt", "hugefile2.txt", "summation.txt")
+    else:
+        add_files_streaming("hugefile1.txt", "hugefile2.txt", "summation.txt")
     end = time.time()
     print(f"Processing took {end - start:.2f} seconds")
 
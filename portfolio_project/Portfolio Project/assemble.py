@@ -0,0 +1,87 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+COPY_SIZE = 64 * 1024 * 1024  # bytes per copy call
+
+
+def copy_range(src_fd, dst_fd, dst_offset, length, src_offset=0):
+    """
+    Copies length bytes from src_fd into dst_fd at dst_offset without moving either file position.
+    Uses os.copy_file_range (kernel-side copy, can share extents), falling back to pread/pwrite.
+    """
+    copied = 0
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while copied < length:
+                n = os.copy_file_range(src_fd, dst_fd, min(COPY_SIZE, length - copied),
+                                       src_offset + copied, dst_offset + copied)
+                if n == 0:
+                    break
+                copied += n
+            if copied == length:
+                return
+        except OSError:
+            pass  # e.g. unsupported across these filesystems, finish with plain copies
+
+    if not hasattr(os, 'pwrite'):
+        # Windows has no positional I/O, so seek both files (callers copy one chunk at a time)
+        os.lseek(src_fd, src_offset + copied, os.SEEK_SET)
+        os.lseek(dst_fd, dst_offset + copied, os.SEEK_SET)
+        while copied < length:
+            data = os.read(src_fd, min(COPY_SIZE, length - copied))
+            if not data:
+                raise EOFError(f"source ended {length - copied} bytes early")
+            written = 0
+            while written < len(data):
+                written += os.write(dst_fd, data[written:])
+            copied += len(data)
+        return
+
+    while copied < length:
+        data = os.pread(src_fd, min(COPY_SIZE, length - copied), src_offset + copied)
+        if not data:
+            raise EOFError(f"source ended {length - copied} bytes early")
+        written = 0
+        while written < len(data):
+            written += os.pwrite(dst_fd, data[written:], dst_offset + copied + written)
+        copied += len(data)
+
+
+def chunk_offsets(lengths):
+    """Prefix sum of chunk lengths: where each chunk starts in the final file, plus the total size."""
+    offsets = [0]
+    for length in lengths:
+        offsets.append(offsets[-1] + length)
+    return offsets
+
+
+def assemble_outputs(chunk_paths, final_output, lengths=None, threads=4, start_offset=0):
+    """
+    Places every chunk at its final offset in a preallocated output file.
+    The chunks are copied concurrently, so there is no serialized read-back through Python.
+
+    Args:
+        chunk_paths (list): Chunk files in output order.
+        final_output (str): File to create.
+        lengths (list): Byte length of each chunk as reported by the workers, or None to stat them.
+        threads (int): Concurrent copies.
+        start_offset (int): Keep the first start_offset bytes of an existing final_output and
+            place the chunks after them (appending to an earlier result).
+    """
+    if lengths is None:
+        lengths = [os.path.getsize(path) for path in chunk_paths]
+    if not hasattr(os, 'pwrite'):
+        threads = 1
+    offsets = chunk_offsets(lengths)
+
+    with open(final_output, 'r+b' if start_offset else 'wb') as outfile:
+        outfile.truncate(start_offset + offsets[-1])
+        out_fd = outfile.fileno()
+
+        def place(i):
+            with open(chunk_paths[i], 'rb') as chunk:
+                copy_range(chunk.fileno(), out_fd, start_offset + offsets[i], lengths[i])
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(place, range(len(chunk_paths))))
+    return final_output
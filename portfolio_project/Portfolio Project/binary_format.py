@@ -0,0 +1,150 @@
+import time
+import argparse
+import numpy as np
+from multiprocessing import Pool, cpu_count
+from numpy_add import aligned_blocks, parse_lines, format_ints
+from partition import partition_files
+
+DTYPE = np.int32  # values are 1-100000 (200000 after adding), 4 bytes instead of 6-7 as text
+SLICE_ROWS = 4 * 1024 * 1024  # rows handled per step inside a worker
+
+# Blank/invalid lines keep their row (so files stay aligned) and are marked with this value
+SENTINEL = np.iinfo(DTYPE).min
+
+
+def _convert_range(args):
+    """Worker: parse one byte range of the text file into its rows of the .npy column."""
+    text_path, npy_path, start, first_row, line_count = args
+    column = np.load(npy_path, mmap_mode='r+')
+    low, high = SENTINEL + 1, np.iinfo(DTYPE).max
+    row = first_row
+
+    with open(text_path, 'rb') as f:
+        f.seek(start)
+        for (block,) in aligned_blocks([f], line_count):
+            try:
+                values, valid = parse_lines(block)
+            except OverflowError as e:
+                raise ValueError(f"{text_path}: {e}") from e
+            if valid.any() and (values[valid].min() < low or values[valid].max() > high):
+                raise ValueError(f"{text_path}: values near row {row} do not fit {np.dtype(DTYPE).name}")
+            values[~valid] = SENTINEL
+            column[row:row + len(values)] = values
+            row += len(values)
+    column.flush()
+    return row - first_row
+
+
+def text_to_npy(text_path, npy_path, workers=None):
+    """
+    One-time conversion of a text column into a fixed-width binary .npy column.
+
+    Args:
+        text_path (str): Newline-delimited integers.
+        npy_path (str): .npy file to create.
+        workers (int): Worker processes, defaults to cpu_count().
+
+    Returns:
+        int: Number of rows written.
+    """
+    workers = workers or cpu_count()
+    tasks = partition_files([text_path], workers * 4)
+    total_rows = sum(line_count for _, _, line_count in tasks)
+    np.lib.format.open_memmap(npy_path, mode='w+', dtype=DTYPE, shape=(total_rows,)).flush()
+
+    jobs = []
+    first_row = 0
+    for _, (start,), line_count in tasks:
+        jobs.append((text_path, npy_path, start, first_row, line_count))
+        first_row += line_count
+
+    with Pool(processes=min(len(jobs), workers)) as pool:
+        pool.map(_convert_range, jobs)
+    return total_rows
+
+
+def _add_slice(args):
+    """Worker: add rows [start, stop) of two memmapped columns into the output column."""
+    path1, path2, out_path, start, stop = args
+    column1 = np.load(path1, mmap_mode='r')
+    column2 = np.load(path2, mmap_mode='r')
+    out = np.load(out_path, mmap_mode='r+')
+    high = np.iinfo(DTYPE).max
+
+    for i in range(start, stop, SLICE_ROWS):
+        j = min(i + SLICE_ROWS, stop)
+        values1 = column1[i:j].astype(np.int64)
+        values2 = column2[i:j].astype(np.int64)
+        invalid = (values1 == SENTINEL) | (values2 == SENTINEL)
+        result = values1 + values2
+        result[invalid] = SENTINEL
+        if result.max(initial=0) > high or result[~invalid].min(initial=0) <= SENTINEL:
+            raise OverflowError(f"sum near row {i} does not fit {np.dtype(DTYPE).name}")
+        out[i:j] = result
+    out.flush()
+
+
+def add_npy(path1, path2, out_path, workers=None):
+    """
+    Adds two .npy columns into a new .npy column, each worker taking a slice of rows.
+
+    Returns:
+        int: Number of rows written (the shorter of the two inputs, like zip()).
+    """
+    workers = workers or cpu_count()
+    rows = min(len(np.load(path1, mmap_mode='r')), len(np.load(path2, mmap_mode='r')))
+    np.lib.format.open_memmap(out_path, mode='w+', dtype=DTYPE, shape=(rows,)).flush()
+
+    step = max(1, -(-rows // workers))  # ceiling division
+    slices = [(path1, path2, out_path, i, min(i + step, rows)) for i in range(0, rows, step)]
+    if slices:
+        with Pool(processes=min(len(slices), workers)) as pool:
+            pool.map(_add_slice, slices)
+    return rows
+
+
+def npy_to_text(npy_path, text_path):
+    """Writes a .npy column back out as text, dropping rows marked invalid."""
+    column = np.load(npy_path, mmap_mode='r')
+    with open(text_path, 'wb') as out:
+        for i in range(0, len(column), SLICE_ROWS):
+            values = column[i:i + SLICE_ROWS]
+            out.write(format_ints(values[values != SENTINEL].astype(np.int64)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Binary columnar storage for the portfolio project inputs.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    convert = commands.add_parser('convert', help="text file -> .npy column")
+    convert.add_argument('text')
+    convert.add_argument('npy')
+
+    add = commands.add_parser('add', help="add two .npy columns into a third")
+    add.add_argument('npy1')
+    add.add_argument('npy2')
+    add.add_argument('output')
+
+    totext = commands.add_parser('totext', help=".npy column -> text file")
+    totext.add_argument('npy')
+    totext.add_argument('text')
+
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: cpu_count)")
+    args = parser.parse_args()
+
+    start = time.time()
+    if args.command == 'convert':
+        rows = text_to_npy(args.text, args.npy, args.workers)
+        print(f"Converted {rows} rows from {args.text} to {args.npy}")
+    elif args.command == 'add':
+        rows = add_npy(args.npy1, args.npy2, args.output, args.workers)
+        print(f"Added {rows} rows into {args.output}")
+    else:
+        npy_to_text(args.npy, args.text)
+        print(f"Wrote {args.text}")
+    end = time.time()
+    print(f"Processing took {end - start:.2f} seconds")
+
+
+if __name__ == '__main__':
+    main()
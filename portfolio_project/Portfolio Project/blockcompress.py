@@ -0,0 +1,174 @@
+import gzip
+import lzma
+import json
+import time
+import argparse
+from multiprocessing import Pool, cpu_count
+from line_index import get_index
+from numpy_add import add_blocks
+
+BLOCK_LINES = 1_000_000  # lines per independently compressed member
+
+# Concatenated gzip members / xz streams are still one valid .gz / .xz file for the usual tools
+CODECS = {
+    'gzip': ('.gz', lambda data: gzip.compress(data, compresslevel=6), gzip.decompress),
+    'lzma': ('.xz', lambda data: lzma.compress(data, format=lzma.FORMAT_XZ), lzma.decompress),
+}
+
+
+def block_index_path(path):
+    return path + '.bidx'
+
+
+def save_block_index(path, codec, block_lines, blocks):
+    """Sidecar listing every member: [byte offset, compressed length, line count]."""
+    with open(block_index_path(path), 'w') as f:
+        json.dump({'codec': codec, 'block_lines': block_lines, 'blocks': blocks}, f)
+
+
+def load_block_index(path):
+    with open(block_index_path(path)) as f:
+        return json.load(f)
+
+
+def read_member(path, index, block):
+    """Decompresses one member of a block-compressed file."""
+    offset, length, _ = index['blocks'][block]
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(length)
+    return CODECS[index['codec']][2](data)
+
+
+def _count_lines(data):
+    return data.count(b'\n') + (1 if data and not data.endswith(b'\n') else 0)
+
+
+def write_members(out_path, codec, block_lines, members):
+    """Writes (compressed bytes, line count) pairs in order and saves the block index."""
+    blocks = []
+    offset = 0
+    with open(out_path, 'wb') as out:
+        for compressed, lines in members:
+            out.write(compressed)
+            blocks.append([offset, len(compressed), lines])
+            offset += len(compressed)
+    save_block_index(out_path, codec, block_lines, blocks)
+    return blocks
+
+
+def _compress_range(task):
+    """Worker: compress one newline-aligned byte range of the text file."""
+    text_path, start, end, codec = task
+    with open(text_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return CODECS[codec][1](data), _count_lines(data)
+
+
+def compress_file(text_path, out_path, codec='gzip', block_lines=BLOCK_LINES, workers=None):
+    """
+    Compresses a text file into independent members of block_lines lines each, in parallel.
+
+    Returns:
+        int: Number of members written.
+    """
+    index = get_index(text_path)
+    starts = [index.line_offset(text_path, line) for line in range(0, index.total_lines, block_lines)]
+    ends = starts[1:] + [index.size]
+    tasks = [(text_path, start, end, codec) for start, end in zip(starts, ends)]
+
+    with Pool(processes=workers or cpu_count()) as pool:
+        # imap keeps member order, the parent writes while the workers compress
+        blocks = write_members(out_path, codec, block_lines, pool.imap(_compress_range, tasks))
+    return len(blocks)
+
+
+def _decompress_member(task):
+    path, index, block = task
+    return read_member(path, index, block)
+
+
+def decompress_file(path, text_path, workers=None):
+    """Decompresses every member in parallel and writes them back out in order."""
+    index = load_block_index(path)
+    tasks = [(path, index, block) for block in range(len(index['blocks']))]
+    with Pool(processes=workers or cpu_count()) as pool, open(text_path, 'wb') as out:
+        for data in pool.imap(_decompress_member, tasks):
+            out.write(data)
+
+
+def _add_members(task):
+    """Worker: decompress member i of both inputs, add them, compress the sums."""
+    path1, index1, path2, index2, block, codec = task
+    data1 = read_member(path1, index1, block)
+    data2 = read_member(path2, index2, block)
+    # add_blocks expects complete lines
+    if data1 and not data1.endswith(b'\n'):
+        data1 += b'\n'
+    if data2 and not data2.endswith(b'\n'):
+        data2 += b'\n'
+    result = add_blocks(data1, data2)
+    return CODECS[codec][1](result), result.count(b'\n')
+
+
+def add_compressed(path1, path2, out_path, codec=None, workers=None):
+    """
+    Adds two block-compressed files member by member; every worker handles its own
+    decompression, addition and compression. The output is block-compressed too.
+
+    Returns:
+        int: Number of members written.
+    """
+    index1 = load_block_index(path1)
+    index2 = load_block_index(path2)
+    if index1['block_lines'] != index2['block_lines']:
+        raise ValueError(f"{path1} and {path2} use different block sizes, their members don't line up")
+    codec = codec or index1['codec']
+    blocks = min(len(index1['blocks']), len(index2['blocks']))
+    tasks = [(path1, index1, path2, index2, block, codec) for block in range(blocks)]
+
+    with Pool(processes=workers or cpu_count()) as pool:
+        written = write_members(out_path, codec, index1['block_lines'], pool.imap(_add_members, tasks))
+    return len(written)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Block-compressed (gzip/xz members + index) input and output.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    compress = commands.add_parser('compress', help="text file -> block-compressed file")
+    compress.add_argument('text')
+    compress.add_argument('output', nargs='?', help="defaults to text + .gz / .xz")
+    compress.add_argument('--codec', choices=sorted(CODECS), default='gzip')
+    compress.add_argument('--block-lines', type=int, default=BLOCK_LINES)
+
+    decompress = commands.add_parser('decompress', help="block-compressed file -> text file")
+    decompress.add_argument('compressed')
+    decompress.add_argument('text')
+
+    add = commands.add_parser('add', help="add two block-compressed files into a third")
+    add.add_argument('compressed1')
+    add.add_argument('compressed2')
+    add.add_argument('output')
+
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: cpu_count)")
+    args = parser.parse_args()
+
+    start = time.time()
+    if args.command == 'compress':
+        output = args.output or args.text + CODECS[args.codec][0]
+        members = compress_file(args.text, output, args.codec, args.block_lines, args.workers)
+        print(f"Wrote {members} members to {output}")
+    elif args.command == 'decompress':
+        decompress_file(args.compressed, args.text, args.workers)
+        print(f"Wrote {args.text}")
+    else:
+        members = add_compressed(args.compressed1, args.compressed2, args.output, workers=args.workers)
+        print(f"Wrote {members} members to {args.output}")
+    end = time.time()
+    print(f"Processing took {end - start:.2f} seconds")
+
+
+if __name__ == '__main__':
+    main()
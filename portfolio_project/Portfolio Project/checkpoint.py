@@ -0,0 +1,109 @@
+import os
+import json
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+MANIFEST_NAME = 'manifest.json'  # inputs and partition layout, written once per run
+JOURNAL_NAME = 'chunks.log'  # one JSON line appended per finished chunk
+READ_SIZE = 16 * 1024 * 1024
+
+
+def fingerprint(file_path):
+    stat = os.stat(file_path)
+    return {'path': os.path.abspath(file_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def file_checksum(file_path):
+    """CRC-32 of a whole file as 8 hex digits."""
+    crc = 0
+    with open(file_path, 'rb') as f:
+        while True:
+            block = f.read(READ_SIZE)
+            if not block:
+                break
+            crc = zlib.crc32(block, crc)
+    return f"{crc:08x}"
+
+
+def manifest_path(output_dir):
+    return os.path.join(output_dir, MANIFEST_NAME)
+
+
+def journal_path(output_dir):
+    return os.path.join(output_dir, JOURNAL_NAME)
+
+
+def new_manifest(input_files, tasks):
+    """Run manifest: input fingerprints, the partition layout and per-chunk completion."""
+    return {
+        'inputs': [fingerprint(path) for path in input_files],
+        'tasks': [tuple(task) for task in tasks],
+        'chunks': {},
+    }
+
+
+def save_manifest(output_dir, manifest):
+    """Writes the layout atomically and rewrites the journal with the chunks known to be done."""
+    path = manifest_path(output_dir)
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'inputs': manifest['inputs'], 'tasks': [list(t) for t in manifest['tasks']]}, f)
+    os.replace(path + '.tmp', path)
+    with open(journal_path(output_dir), 'w') as journal:
+        for index, record in manifest['chunks'].items():
+            journal.write(json.dumps(dict(record, index=int(index))) + '\n')
+
+
+def load_manifest(output_dir, input_files):
+    """Returns the saved manifest if it belongs to these exact inputs, otherwise None."""
+    path = manifest_path(output_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except ValueError:
+        return None
+    if manifest.get('inputs') != [fingerprint(p) for p in input_files]:
+        return None
+    manifest['tasks'] = [tuple(task) for task in manifest['tasks']]
+    manifest['chunks'] = {}
+
+    if os.path.exists(journal_path(output_dir)):
+        with open(journal_path(output_dir)) as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # last line cut short by the crash
+                manifest['chunks'][str(record.pop('index'))] = record
+    return manifest
+
+
+def mark_done(output_dir, manifest, index, length, checksum):
+    """Records a finished chunk: one appended line, never a rewrite of the whole manifest."""
+    record = {'bytes': length, 'crc32': checksum}
+    manifest['chunks'][str(index)] = record
+    with open(journal_path(output_dir), 'a') as journal:
+        journal.write(json.dumps(dict(record, index=index)) + '\n')
+
+
+def chunk_is_valid(manifest, index, chunk_path):
+    """A chunk counts as done only if its file still has the recorded size and checksum."""
+    record = manifest['chunks'].get(str(index))
+    if record is None or not os.path.exists(chunk_path):
+        return False
+    return os.path.getsize(chunk_path) == record['bytes'] and file_checksum(chunk_path) == record['crc32']
+
+
+def pending_tasks(manifest, chunk_path):
+    """Tasks whose chunk output is missing or corrupt. chunk_path(index) gives its file."""
+    tasks = manifest['tasks']
+    # zlib releases the GIL on large buffers, so finished chunks are re-checked concurrently
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        valid = list(executor.map(lambda task: chunk_is_valid(manifest, task[0], chunk_path(task[0])), tasks))
+    pending = []
+    for task, ok in zip(tasks, valid):
+        if not ok:
+            manifest['chunks'].pop(str(task[0]), None)
+            pending.append(task)
+    return pending
@@ -0,0 +1,144 @@
+import os
+import time
+import hashlib
+import argparse
+from partition import nth_newline
+from assemble import copy_range
+from scheduler import run_ordered
+
+CACHE_DIR = '.chunk_cache'  # finished out_chunk files, named by the hash of the input chunks
+CACHE_LIMIT = 4 * 1024 * 1024 * 1024  # bytes kept after evict(), least recently used go first
+READ_SIZE = 16 * 1024 * 1024
+OPERATION = 'add'  # part of every key, so a different operation never reuses these results
+
+
+def _hash_lines(digest, path, start, line_count):
+    """Feeds line_count lines of path starting at byte start (all of it for None) into digest."""
+    remaining = line_count
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while remaining is None or remaining > 0:
+            block = f.read(READ_SIZE)
+            if not block:
+                break
+            if remaining is not None:
+                newlines = block.count(b'\n')
+                if newlines >= remaining:
+                    block = block[:nth_newline(block, remaining) + 1]
+                    newlines = remaining
+                remaining -= newlines
+            digest.update(block)
+
+
+def chunk_key(ranges, line_count=None, operation=OPERATION):
+    """
+    Content hash of one chunk of every input.
+
+    Args:
+        ranges (list): (path, start offset) per input file.
+        line_count (int): Lines in the chunk, None to read every file to its end.
+        operation (str): What is computed from the chunk.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{operation}|{len(ranges)}|{line_count}".encode())
+    for path, start in ranges:
+        digest.update(b'|')
+        _hash_lines(digest, path, start, line_count)
+    return digest.hexdigest()
+
+
+def range_key(job):
+    """Worker: key of one byte-range chunk, job = (file1, file2, (index, start1, start2, line_count))."""
+    file1, file2, task = job
+    return chunk_key([(file1, task[1]), (file2, task[2])], task[3])
+
+
+def files_key(job):
+    """Worker: key of one pair of whole split chunk files, job = (file1, file2)."""
+    return chunk_key([(path, 0) for path in job])
+
+
+def entry_path(key, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, key + '.txt')
+
+
+def _copy(src, dst):
+    """
+    Copies src to a temp file next to dst and renames it over dst. Never a hard link: the
+    pipelines rewrite outputs/out_chunk_N.txt in place, which would change a shared entry too.
+    copy_file_range lets filesystems with reflinks share the blocks copy-on-write.
+    """
+    temp = f"{dst}.{os.getpid()}.tmp"
+    with open(src, 'rb') as source, open(temp, 'wb') as target:
+        copy_range(source.fileno(), target.fileno(), 0, os.fstat(source.fileno()).st_size)
+    os.replace(temp, dst)
+
+
+def fetch(key, output_file, cache_dir=CACHE_DIR):
+    """Puts a copy of the cached chunk for key at output_file and returns True, or returns False on a miss."""
+    entry = entry_path(key, cache_dir)
+    try:
+        _copy(entry, output_file)
+    except FileNotFoundError:
+        return False
+    os.utime(entry)  # mark as recently used
+    return True
+
+
+def store(key, output_file, cache_dir=CACHE_DIR):
+    """Adds a copy of a freshly written chunk to the cache."""
+    os.makedirs(cache_dir, exist_ok=True)
+    _copy(output_file, entry_path(key, cache_dir))
+
+
+def lookup(key_func, key_jobs, output_files, cache_dir=CACHE_DIR):
+    """
+    Hashes every chunk in parallel (key_func over key_jobs, see range_key and files_key) and
+    copies the cached results into output_files.
+
+    Returns:
+        tuple: (key of every chunk, positions that missed and still have to be computed)
+    """
+    keys = run_ordered(key_func, key_jobs)
+    misses = [i for i, (key, output_file) in enumerate(zip(keys, output_files))
+              if not fetch(key, output_file, cache_dir)]
+    print(f"{len(keys) - len(misses)} of {len(keys)} chunks taken from {cache_dir}")
+    return keys, misses
+
+
+def evict(limit=CACHE_LIMIT, cache_dir=CACHE_DIR):
+    """Deletes least recently used entries until the cache holds at most limit bytes. Returns bytes freed."""
+    if not os.path.isdir(cache_dir):
+        return 0
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        stat = os.stat(path)
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    freed = 0
+    for _, size, path in sorted(entries):
+        if total - freed <= limit:
+            break
+        os.remove(path)
+        freed += size
+    return freed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect, trim or clear the per-chunk result cache.")
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--limit', type=float, default=CACHE_LIMIT / 1024 ** 3, help="size limit in GB")
+    parser.add_argument('--clear', action='store_true', help="delete every entry")
+    args = parser.parse_args()
+
+    start = time.time()
+    freed = evict(0 if args.clear else int(args.limit * 1024 ** 3), args.cache_dir)
+    names = os.listdir(args.cache_dir) if os.path.isdir(args.cache_dir) else []
+    size = sum(os.path.getsize(os.path.join(args.cache_dir, name)) for name in names)
+    print(f"Freed {freed / 1024 ** 2:.1f} MB, {len(names)} entries / {size / 1024 ** 2:.1f} MB left "
+          f"in {args.cache_dir} ({time.time() - start:.2f} seconds)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,342 @@
+import os
+import time
+import shutil
+import socket
+import argparse
+import threading
+from collections import deque
+from multiprocessing import Process, cpu_count
+from multiprocessing.managers import BaseManager
+from partition import partition_pair, add_range_pair
+from numpy_add import add_range_pair_numpy
+from assemble import assemble_outputs
+from scheduler import choose_task_count
+import tracing
+
+# Every host must see the inputs and the output directory under the same paths (shared storage)
+PORT = 50507
+# Managers exchange pickles, so anyone holding the key can run code on the coordinator and workers.
+# Multi-host runs take it from this variable (never a built-in default), local runs use a random one.
+AUTHKEY_VARIABLE = 'CSC507_AUTHKEY'
+HEARTBEAT_SECONDS = 5  # workers report in this often while they work on a chunk
+WORKER_TIMEOUT = 30  # a worker silent for this long is considered gone, its chunks are handed out again
+MAX_ATTEMPTS = 3  # a chunk that fails this often aborts the whole job
+POLL_SECONDS = 0.5  # how often idle workers ask again and the coordinator checks for dead workers
+CONNECT_SECONDS = 30  # workers may be started before the coordinator
+WAIT = 'wait'  # get_task() answer when nothing is pending but chunks are still running elsewhere
+
+
+class Coordinator:
+    """
+    Job state, served to the workers through a manager. Hands out one chunk per get_task(),
+    takes the first completion of every chunk, requeues the chunks of failed or silent workers.
+    """
+
+    def __init__(self, jobs, max_attempts=MAX_ATTEMPTS, timeout=WORKER_TIMEOUT):
+        self.lock = threading.Lock()
+        self.jobs = jobs
+        self.pending = deque(range(len(jobs)))
+        self.attempts = [0] * len(jobs)
+        self.running = {}  # chunk position -> worker
+        self.results = {}  # chunk position -> (chunk file, byte length)
+        self.seen = {}  # worker -> monotonic time of its last call
+        self.released = set()  # workers told there is nothing left
+        self.error = None
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+
+    def finished(self):
+        return self.error is not None or len(self.results) == len(self.jobs)
+
+    def get_task(self, worker):
+        """The next job for worker, WAIT, or None once the whole job is done or has failed."""
+        with self.lock:
+            self.seen[worker] = time.monotonic()
+            if self.finished():
+                self.released.add(worker)
+                return None
+            if not self.pending:
+                return WAIT
+            position = self.pending.popleft()
+            self.attempts[position] += 1
+            self.running[position] = worker
+            return dict(self.jobs[position], position=position, attempt=self.attempts[position])
+
+    def heartbeat(self, worker):
+        with self.lock:
+            self.seen[worker] = time.monotonic()
+
+    def complete(self, worker, position, path, length):
+        """Records a finished chunk. Returns False for a chunk someone else already delivered."""
+        with self.lock:
+            self.seen[worker] = time.monotonic()
+            if position in self.results:
+                return False
+            if not os.path.exists(path) or os.path.getsize(path) != length:
+                # The worker wrote somewhere this host can't see: the storage isn't shared
+                self._retry(position, f"{worker}: {path} is not {length} bytes here")
+                return False
+            self.results[position] = (path, length)
+            self.running.pop(position, None)
+            return True
+
+    def fail(self, worker, position, error):
+        with self.lock:
+            self.seen[worker] = time.monotonic()
+            if position not in self.results:
+                self._retry(position, f"{worker}: {error}")
+
+    def _retry(self, position, reason):
+        self.running.pop(position, None)
+        if self.attempts[position] >= self.max_attempts:
+            self.error = f"chunk {self.jobs[position]['index']} failed {self.attempts[position]} times, last: {reason}"
+        elif position not in self.pending:
+            self.pending.appendleft(position)
+            print(f"Retrying chunk {self.jobs[position]['index']} ({reason})")
+
+    def reap(self):
+        """Hands the chunks of workers that stopped calling in back out. Returns those workers."""
+        with self.lock:
+            now = time.monotonic()
+            gone = {worker for worker, seen in self.seen.items()
+                    if now - seen > self.timeout and worker not in self.released}
+            for position, worker in list(self.running.items()):
+                if worker in gone:
+                    self._retry(position, f"{worker}: no heartbeat for {self.timeout} seconds")
+            for worker in gone:
+                del self.seen[worker]
+            return gone
+
+    def idle(self):
+        """True once every worker still calling in has been told the job is over."""
+        with self.lock:
+            return set(self.seen) <= self.released
+
+    def ordered_results(self):
+        """(chunk files, byte lengths) in chunk order for assembly."""
+        with self.lock:
+            return ([self.results[i][0] for i in range(len(self.jobs))],
+                    [self.results[i][1] for i in range(len(self.jobs))])
+
+
+class ClusterManager(BaseManager):
+    pass
+
+
+_coordinator = None  # served by the coordinator process, workers only get proxies
+
+
+def _get_coordinator():
+    return _coordinator
+
+
+ClusterManager.register('coordinator', callable=_get_coordinator)
+
+
+def shared_authkey():
+    """The key every host of a multi-host run shares, from CSC507_AUTHKEY."""
+    key = os.environ.get(AUTHKEY_VARIABLE)
+    if not key:
+        raise ValueError(f"set {AUTHKEY_VARIABLE} to the same secret on the coordinator and every worker host")
+    return key.encode()
+
+
+def parse_address(text):
+    host, _, port = text.rpartition(':')
+    return host or 'localhost', int(port or PORT)
+
+
+def range_jobs(file1, file2, parts_dir, units=None, use_numpy=False):
+    """One job per byte-range chunk of the original files (see partition.py)."""
+    units = units or choose_task_count(os.path.getsize(file1) + os.path.getsize(file2))
+    return [{'index': task[0], 'file1': os.path.abspath(file1), 'file2': os.path.abspath(file2),
+             'task': task, 'parts_dir': os.path.abspath(parts_dir), 'use_numpy': use_numpy}
+            for task in partition_pair(file1, file2, units)]
+
+
+def split_jobs(split_dir1, split_dir2, parts_dir, use_numpy=False):
+    """One job per pair of existing chunk_<i>.txt split files, read whole."""
+    count = len([name for name in os.listdir(split_dir1) if name.startswith('chunk_')])
+    return [{'index': i, 'file1': os.path.abspath(os.path.join(split_dir1, f"chunk_{i}.txt")),
+             'file2': os.path.abspath(os.path.join(split_dir2, f"chunk_{i}.txt")),
+             'task': (i, 0, 0, None), 'parts_dir': os.path.abspath(parts_dir), 'use_numpy': use_numpy}
+            for i in range(count)]
+
+
+def run_coordinator(jobs, output, address, authkey, max_attempts=MAX_ATTEMPTS, timeout=WORKER_TIMEOUT):
+    """
+    Serves jobs to workers until every chunk is done, then assembles output in chunk order.
+    Blocks until the workers still connected have been told to stop (or timed out).
+    """
+    global _coordinator
+    if not jobs:
+        raise ValueError("no chunks to hand out")
+    parts_dir = jobs[0]['parts_dir']
+    _coordinator = Coordinator(jobs, max_attempts, timeout)
+    os.makedirs(parts_dir, exist_ok=True)
+    server = ClusterManager(address=address, authkey=authkey).get_server()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving {len(jobs)} chunks on port {server.address[1]}")
+
+    while not _coordinator.finished():
+        time.sleep(POLL_SECONDS)
+        for worker in _coordinator.reap():
+            print(f"Lost worker {worker}")
+    if _coordinator.error is not None:
+        raise RuntimeError(_coordinator.error)
+
+    with tracing.stage('assemble_outputs', chunks=len(jobs)):
+        paths, lengths = _coordinator.ordered_results()
+        assemble_outputs(paths, output, lengths)
+    shutil.rmtree(parts_dir, ignore_errors=True)
+
+    deadline = time.monotonic() + timeout
+    while not _coordinator.idle() and time.monotonic() < deadline:
+        time.sleep(POLL_SECONDS)
+        _coordinator.reap()
+    return lengths
+
+
+def connect(address, authkey, wait=CONNECT_SECONDS):
+    """Proxy of the coordinator at address, retrying while it isn't up yet."""
+    deadline = time.monotonic() + wait
+    while True:
+        manager = ClusterManager(address=address, authkey=authkey)
+        try:
+            manager.connect()
+            return manager.coordinator()
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(POLL_SECONDS)
+
+
+def _heartbeat(address, authkey, worker, stop):
+    # Own connection: proxies shouldn't be shared between threads
+    coordinator = connect(address, authkey)
+    while not stop.wait(HEARTBEAT_SECONDS):
+        try:
+            coordinator.heartbeat(worker)
+        except (OSError, EOFError):
+            return
+
+
+def run_job(job, worker):
+    """process_file_pair for one job: adds its chunk into a file of this worker's own."""
+    path = os.path.join(job['parts_dir'], f"out_chunk_{job['index']}.{worker}.txt")
+    with tracing.stage('cluster_chunk', profile=True, chunk=job['index'], worker=worker, attempt=job['attempt']):
+        if job['use_numpy']:
+            add_range_pair_numpy(job['file1'], job['file2'], job['task'], path)
+        else:
+            add_range_pair(job['file1'], job['file2'], job['task'], path)
+        tracing.record_output(path)
+    return path
+
+
+def worker_loop(address, authkey, exit_after=None):
+    """Asks the coordinator for chunks until it says the job is over. Returns chunks delivered."""
+    worker = f"{socket.gethostname()}-{os.getpid()}"
+    coordinator = connect(address, authkey)
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(address, authkey, worker, stop), daemon=True).start()
+    delivered = 0
+    try:
+        while True:
+            job = coordinator.get_task(worker)
+            if job is None:
+                break
+            if job == WAIT:
+                time.sleep(POLL_SECONDS)
+                continue
+            if exit_after is not None and delivered >= exit_after:
+                os._exit(1)  # simulated crash: the chunk is left running until the heartbeat times out
+            try:
+                path = run_job(job, worker)
+            except Exception as exc:
+                coordinator.fail(worker, job['position'], f"{type(exc).__name__}: {exc}")
+                continue
+            if coordinator.complete(worker, job['position'], path, os.path.getsize(path)):
+                delivered += 1
+            elif os.path.exists(path):
+                os.remove(path)  # another worker got there first
+    except (OSError, EOFError):
+        pass  # coordinator finished and went away
+    finally:
+        stop.set()
+    return delivered
+
+
+def start_workers(address, processes, authkey, exit_after=None):
+    workers = [Process(target=worker_loop, args=(address, authkey, exit_after)) for _ in range(processes)]
+    for process in workers:
+        process.start()
+    return workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add two files across several hosts sharing storage.")
+    sub = parser.add_subparsers(dest='mode', required=True)
+
+    coordinator = sub.add_parser('coordinator', help="partition the inputs, hand out chunks, assemble the result")
+    local = sub.add_parser('local', help="coordinator plus worker processes on this host, over TCP")
+    for p in (coordinator, local):
+        p.add_argument('input1', nargs='?', default='hugefile1.txt')
+        p.add_argument('input2', nargs='?', default='hugefile2.txt')
+        p.add_argument('output', nargs='?', default='totalfile2.txt')
+        p.add_argument('--split-dirs', nargs=2, metavar=('DIR1', 'DIR2'),
+                       help="hand out existing split chunk pairs instead of byte ranges")
+        p.add_argument('--units', type=int, default=None, help="byte-range chunks (default: from file size)")
+        p.add_argument('--numpy', action='store_true', help="workers use the vectorized NumPy kernel")
+        p.add_argument('--timeout', type=float, default=WORKER_TIMEOUT, help="seconds without a heartbeat")
+        p.add_argument('--attempts', type=int, default=MAX_ATTEMPTS)
+    coordinator.add_argument('--host', default='', help="interface to listen on (default: all)")
+    coordinator.add_argument('--port', type=int, default=PORT)
+    local.add_argument('--port', type=int, default=PORT)
+    local.add_argument('--workers', type=int, default=cpu_count())
+    local.add_argument('--crash', type=int, default=0, help="extra workers that die after one chunk (tries the retries)")
+
+    worker = sub.add_parser('worker', help="process chunks for a coordinator")
+    worker.add_argument('coordinator', help="host:port of the coordinator")
+    worker.add_argument('--processes', type=int, default=cpu_count())
+    args = parser.parse_args()
+
+    if args.mode == 'worker':
+        try:
+            authkey = shared_authkey()
+        except ValueError as exc:
+            parser.error(str(exc))
+        for process in start_workers(parse_address(args.coordinator), args.processes, authkey):
+            process.join()
+        return
+
+    start = time.time()
+    parts_dir = args.output + '.parts'
+    if args.split_dirs:
+        jobs = split_jobs(args.split_dirs[0], args.split_dirs[1], parts_dir, args.numpy)
+    else:
+        jobs = range_jobs(args.input1, args.input2, parts_dir, args.units, args.numpy)
+    if not jobs:
+        parser.error(f"no chunk_<i>.txt files in {args.split_dirs[0]}")
+    workers = []
+    if args.mode == 'local':
+        # Loopback only, with a key nobody else knows; forked before the server thread starts,
+        # the workers connect as soon as it is up
+        address = ('127.0.0.1', args.port)
+        authkey = os.urandom(32)
+        workers = (start_workers(address, args.crash, authkey, exit_after=1)
+                   + start_workers(address, args.workers, authkey))
+    else:
+        try:
+            authkey = shared_authkey()
+        except ValueError as exc:
+            parser.error(str(exc))
+        address = (args.host, args.port)
+    lengths = run_coordinator(jobs, args.output, address, authkey, args.attempts, args.timeout)
+    for process in workers:
+        process.join()
+    print(f"Done. {len(lengths)} chunks, {sum(lengths)} bytes written to {args.output} "
+          f"in {time.time() - start:.2f} seconds")
+
+
+if __name__ == '__main__':
+    main()
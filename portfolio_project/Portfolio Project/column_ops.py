@@ -0,0 +1,246 @@
+import os
+import ast
+import time
+import argparse
+import functools
+from itertools import islice
+import numpy as np
+from numpy_add import LIMIT, aligned_blocks, parse_lines, format_ints
+from partition import partition_files
+from scheduler import choose_task_count, run_ordered
+from assemble import assemble_outputs
+
+BATCH_LINES = 100_000  # rows evaluated per batch on the Python backend
+OUTPUT_DIR = 'outputs_columns'  # chunk files of --parallel, kept apart from multi_add*'s outputs/
+
+# Built-in operations, written as expressions over the columns c0, c1, ...
+OPERATIONS = {
+    'add': lambda names: ' + '.join(names),
+    'sub': lambda names: ' - '.join(names),
+    'mul': lambda names: ' * '.join(names),
+    'min': lambda names: f"min({', '.join(names)})",
+    'max': lambda names: f"max({', '.join(names)})",
+}
+
+# The only syntax an expression may use: integer arithmetic over columns plus min/max/abs
+ALLOWED_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Load, ast.Constant,
+                 ast.Add, ast.Sub, ast.Mult, ast.USub, ast.UAdd)
+FUNCTIONS = ('min', 'max', 'abs')
+
+NUMPY_FUNCTIONS = {
+    'min': lambda *columns: functools.reduce(np.minimum, columns),
+    'max': lambda *columns: functools.reduce(np.maximum, columns),
+    'abs': np.abs,
+}
+
+
+def build_expression(operation, column_count, weights=None, expression=None):
+    """Turns an operation name (or a user expression) into an expression string over c0..cN."""
+    names = [f"c{i}" for i in range(column_count)]
+    if operation == 'expr':
+        if not expression:
+            raise ValueError("--op expr needs an expression")
+        return expression
+    if operation == 'weighted':
+        if weights is None or len(weights) != column_count:
+            raise ValueError(f"weighted needs one weight per input ({column_count})")
+        return ' + '.join(f"{int(w)} * {name}" for w, name in zip(weights, names))
+    if operation not in OPERATIONS:
+        raise ValueError(f"unknown operation {operation!r}")
+    if column_count == 1:
+        return names[0]
+    return OPERATIONS[operation](names)
+
+
+def validate_expression(expression, column_count):
+    """Parses expression and rejects anything but the allowed arithmetic, returns the AST."""
+    tree = ast.parse(expression, mode='eval')
+    names = {f"c{i}" for i in range(column_count)}
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_NODES):
+            raise ValueError(f"{type(node).__name__} is not allowed in an expression")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, int):
+            raise ValueError(f"only integer constants are allowed, got {node.value!r}")
+        if isinstance(node, ast.Call) and not (isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS
+                                               and not node.keywords):
+            raise ValueError(f"only {', '.join(FUNCTIONS)} may be called")
+        if isinstance(node, ast.Name) and node.id not in names and node.id not in FUNCTIONS:
+            raise ValueError(f"unknown column {node.id!r}, inputs are c0..c{column_count - 1}")
+    return tree
+
+
+def value_bound(node):
+    """Largest magnitude node (or any part of it) can reach while every column value stays below LIMIT."""
+    if isinstance(node, ast.Expression):
+        return value_bound(node.body)
+    if isinstance(node, ast.Name):
+        return LIMIT
+    if isinstance(node, ast.Constant):
+        return abs(node.value)
+    if isinstance(node, ast.UnaryOp):
+        return value_bound(node.operand)
+    if isinstance(node, ast.Call):
+        return max(value_bound(arg) for arg in node.args)  # min, max and abs never grow a value
+    left, right = value_bound(node.left), value_bound(node.right)
+    return left * right if isinstance(node.op, ast.Mult) else left + right
+
+
+@functools.lru_cache(maxsize=None)
+def compile_expression(expression, column_count, numpy_functions=False):
+    """
+    Compiles a validated expression into a function taking one argument per column.
+
+    Returns:
+        tuple: (function, how far int64 results can be trusted: 'exact' when no intermediate
+        can leave int64, 'check' when only the final magnitude needs checking, 'python' otherwise)
+    """
+    tree = validate_expression(expression, column_count)
+    if value_bound(tree) < 2 ** 63:
+        int64 = 'exact'
+    elif not any(isinstance(node, ast.Call) for node in ast.walk(tree)):
+        # +, - and * wrap around modulo 2**64, so the int64 result is right whenever the true one fits
+        int64 = 'check'
+    else:
+        int64 = 'python'  # min/max/abs of a wrapped intermediate would be wrong
+    args = ', '.join(f"c{i}" for i in range(column_count))
+    namespace = {'__builtins__': {}}
+    namespace.update(NUMPY_FUNCTIONS if numpy_functions else {'min': min, 'max': max, 'abs': abs})
+    return eval(compile(f"lambda {args}: {expression}", '<expression>', 'eval'), namespace), int64
+
+
+def _parse(value):
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None  # skip invalid lines
+
+
+def evaluate_rows_python(rows, func):
+    """Evaluates one batch of raw line tuples; rows with any blank or invalid column are skipped."""
+    columns = [[] for _ in range(len(rows[0]))] if rows else []
+    for row in rows:
+        values = [_parse(value) for value in row]
+        if None not in values:
+            for column, value in zip(columns, values):
+                column.append(value)
+    if not columns or not columns[0]:
+        return b''
+    return ''.join(f"{result}\n" for result in map(func, *columns)).encode()
+
+
+def evaluate_blocks_numpy(blocks, expression):
+    """Evaluates one set of aligned blocks with NumPy, falling back to Python where int64 won't do."""
+    func, int64 = compile_expression(expression, len(blocks), True)
+    try:
+        parsed = [parse_lines(block) for block in blocks] if int64 != 'python' else None
+    except OverflowError:
+        parsed = None
+    if parsed is not None:
+        keep = functools.reduce(np.logical_and, [valid for _, valid in parsed])
+        columns = [values[keep] for values, _ in parsed]
+        try:
+            # Inputs stay below 10**18 (LIMIT); when the bound of the expression doesn't fit int64,
+            # check the magnitude of the result in float64 before trusting the int64 one
+            safe = int64 == 'exact' or not len(columns[0]) or \
+                np.abs(np.asarray(func(*[c.astype(np.float64) for c in columns]), dtype=np.float64)).max() < 2.0 ** 62
+            if safe:
+                # broadcast_to: an expression of constants only gives one value for every row
+                return format_ints(np.broadcast_to(np.asarray(func(*columns), dtype=np.int64), len(columns[0])))
+        except OverflowError:
+            pass  # a constant too large for int64
+    python_func, _ = compile_expression(expression, len(blocks))
+    rows = list(zip(*[block.split(b'\n')[:-1] for block in blocks]))
+    return evaluate_rows_python(rows, python_func)
+
+
+def evaluate_range(paths, output, expression, starts=None, line_count=None, backend='numpy'):
+    """
+    Runs expression over aligned input files into output, streaming batch by batch.
+
+    Args:
+        paths (list): Input files, one column each.
+        output (str): File to write.
+        expression (str): Expression over c0..cN (see build_expression).
+        starts (list): Byte offset to start at in each input, defaults to the beginning.
+        line_count (int): Rows to process, or None for all.
+        backend (str): 'numpy' for vectorized blocks or 'python' for batched map().
+    """
+    files = [open(path, 'rb') for path in paths]
+    try:
+        for f, start in zip(files, starts or [0] * len(files)):
+            f.seek(start)
+        with open(output, 'wb') as out:
+            if backend == 'numpy':
+                for blocks in aligned_blocks(files, line_count):
+                    out.write(evaluate_blocks_numpy(blocks, expression))
+            else:
+                func, _ = compile_expression(expression, len(paths))
+                rows_iter = zip(*files)
+                if line_count is not None:
+                    rows_iter = islice(rows_iter, line_count)
+                while True:
+                    rows = list(islice(rows_iter, BATCH_LINES))
+                    if not rows:
+                        break
+                    out.write(evaluate_rows_python(rows, func))
+    finally:
+        for f in files:
+            f.close()
+    return output
+
+
+def _evaluate_task(task):
+    """Worker: one byte-range chunk of every input."""
+    paths, expression, backend, (index, starts, line_count) = task
+    output = os.path.join(OUTPUT_DIR, f"out_chunk_{index}.txt")
+    evaluate_range(paths, output, expression, starts, line_count, backend)
+    return os.path.getsize(output)
+
+
+def evaluate_parallel(paths, output, expression, backend='numpy', units=None):
+    """Split-parallel version: byte-range partitions of every input, assembled in order."""
+    validate_expression(expression, len(paths))
+    units = units or choose_task_count(sum(os.path.getsize(path) for path in paths))
+    tasks = partition_files(paths, units)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    lengths = run_ordered(_evaluate_task, [(paths, expression, backend, task) for task in tasks])
+    chunk_paths = [os.path.join(OUTPUT_DIR, f"out_chunk_{task[0]}.txt") for task in tasks]
+    assemble_outputs(chunk_paths, output, lengths)
+    for path in chunk_paths:
+        os.remove(path)
+    if not os.listdir(OUTPUT_DIR):
+        os.rmdir(OUTPUT_DIR)
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Elementwise operations over aligned files of integers.")
+    parser.add_argument('output')
+    parser.add_argument('inputs', nargs='+')
+    parser.add_argument('--op', default='add', choices=sorted(OPERATIONS) + ['weighted', 'expr'])
+    parser.add_argument('--weights', type=int, nargs='+', help="integer weights for --op weighted")
+    parser.add_argument('--expr', help="expression over c0, c1, ... for --op expr, e.g. '2 * c0 - max(c1, c2)'")
+    parser.add_argument('--backend', choices=['numpy', 'python'], default='numpy')
+    parser.add_argument('--parallel', action='store_true', help="split the inputs across a process pool")
+    args = parser.parse_args()
+
+    try:
+        expression = build_expression(args.op, len(args.inputs), args.weights, args.expr)
+        validate_expression(expression, len(args.inputs))
+    except (ValueError, SyntaxError) as e:
+        parser.error(str(e))
+
+    start = time.time()
+    if args.parallel:
+        evaluate_parallel(args.inputs, args.output, expression, args.backend)
+    else:
+        evaluate_range(args.inputs, args.output, expression, backend=args.backend)
+    end = time.time()
+    print(f"{expression} over {len(args.inputs)} files took {end - start:.2f} seconds")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+import os
+import sys
+import json
+import time
+import zlib
+import argparse
+import numpy as np
+from numpy_add import READ_SIZE, aligned_blocks, parse_lines
+from checkpoint import fingerprint
+from assemble import chunk_offsets
+from scheduler import run_ordered
+
+# Sums are kept modulo 2**64 (uint64 wraparound), which keeps them linear:
+#   sum(out) == sum(in1) + sum(in2)   and   sum(k * out[k]) == sum(k * (in1[k] + in2[k]))
+# The weighted sum (k = row number inside the chunk, from 1) also catches swapped or shifted rows.
+MASK = (1 << 64) - 1
+
+
+def digest_path(output):
+    return output + '.digest.json'
+
+
+def _values(block):
+    """Parsed values of a block of complete lines as uint64 (mod 2**64), plus the valid mask."""
+    try:
+        values, valid = parse_lines(block)
+        return values.astype(np.uint64), valid
+    except OverflowError:
+        # Numbers the int64 kernel can't hold: parse with int() and wrap them by hand
+        lines = block.split(b'\n')[:-1]
+        values = np.zeros(len(lines), dtype=np.uint64)
+        valid = np.zeros(len(lines), dtype=bool)
+        for i, line in enumerate(lines):
+            line = line.strip()
+            if line:
+                try:
+                    values[i] = int(line) & MASK
+                    valid[i] = True
+                except ValueError:
+                    pass
+        return values, valid
+
+
+def _weighted(values, first_row):
+    weights = np.arange(first_row + 1, first_row + len(values) + 1, dtype=np.uint64)
+    return int((values * weights).sum(dtype=np.uint64))
+
+
+def _range_blocks(f, start, length, read_size=READ_SIZE):
+    """Yields (raw bytes, complete lines) blocks of f[start:start + length]."""
+    f.seek(start)
+    carry = b''
+    left = length
+    while left > 0:
+        raw = f.read(min(read_size, left))
+        if not raw:
+            break
+        left -= len(raw)
+        data = carry + raw
+        cut = data.rfind(b'\n') + 1 if left > 0 else len(data)
+        carry = data[cut:]
+        block = data[:cut]
+        if block and not block.endswith(b'\n'):
+            block += b'\n'  # last line of the file without a newline
+        yield raw, block
+
+
+class ChunkDigest:
+    """
+    Digest of one chunk built up block by block while the lines are in memory. The pipeline
+    workers feed it as they add (no extra read), verify_output feeds it from a re-read.
+    """
+
+    def __init__(self):
+        self.rows = self.sum1 = self.sum2 = self.weighted_in = 0
+        self.rows_out = self.sum_out = self.weighted_out = self.invalid_out = 0
+        self.bytes = self.crc = 0
+
+    def add_inputs(self, block1, block2):
+        """Rows of two aligned input blocks that the pipeline keeps (both sides valid)."""
+        values1, valid1 = _values(block1)
+        values2, valid2 = _values(block2)
+        n = min(len(values1), len(values2))
+        keep = valid1[:n] & valid2[:n]
+        kept1, kept2 = values1[:n][keep], values2[:n][keep]
+        self.sum1 += int(kept1.sum(dtype=np.uint64))
+        self.sum2 += int(kept2.sum(dtype=np.uint64))
+        self.weighted_in += _weighted(kept1 + kept2, self.rows)
+        self.rows += len(kept1)
+
+    def add_output(self, raw, block=None):
+        """Output bytes exactly as written; block is the same as complete lines if raw doesn't end in one."""
+        self.crc = zlib.crc32(raw, self.crc)
+        self.bytes += len(raw)
+        values, valid = _values(raw if block is None else block)
+        self.invalid_out += int((~valid).sum())
+        values = values[valid]
+        self.sum_out += int(values.sum(dtype=np.uint64))
+        self.weighted_out += _weighted(values, self.rows_out)
+        self.rows_out += len(values)
+
+    def result(self):
+        return {'rows': self.rows, 'sum1': self.sum1 & MASK, 'sum2': self.sum2 & MASK,
+                'weighted_in': self.weighted_in & MASK, 'rows_out': self.rows_out, 'sum_out': self.sum_out & MASK,
+                'weighted_out': self.weighted_out & MASK, 'invalid_out': self.invalid_out, 'bytes': self.bytes,
+                'crc32': f"{self.crc:08x}"}
+
+
+def digest_chunk(job):
+    """Worker: digest of one partition re-read from the inputs and the finished output."""
+    file1, file2, output, (index, start1, start2, line_count), out_start, out_length = job
+    digest = ChunkDigest()
+    with open(file1, 'rb') as f1, open(file2, 'rb') as f2:
+        f1.seek(start1)
+        f2.seek(start2)
+        for block1, block2 in aligned_blocks([f1, f2], line_count):
+            digest.add_inputs(block1, block2)
+    with open(output, 'rb') as f:
+        for raw, block in _range_blocks(f, out_start, out_length):
+            digest.add_output(raw, block)
+    return digest.result()
+
+
+def _jobs(file1, file2, output, tasks, lengths):
+    offsets = chunk_offsets(lengths)
+    return [(file1, file2, output, tuple(task), start, length)
+            for task, start, length in zip(tasks, offsets, lengths)]
+
+
+def chunk_problems(digest, expected=None):
+    """What is wrong with one recomputed chunk digest: broken invariants, then differences from the manifest."""
+    problems = []
+    if digest['invalid_out']:
+        problems.append(f"{digest['invalid_out']} unreadable output lines")
+    if digest['rows_out'] != digest['rows']:
+        problems.append(f"{digest['rows_out']} output rows for {digest['rows']} input rows")
+    if digest['sum_out'] != (digest['sum1'] + digest['sum2']) & MASK:
+        problems.append("output sum != input sums")
+    elif digest['weighted_out'] != digest['weighted_in']:
+        problems.append("rows out of order or misplaced")
+    if expected is not None:
+        for key in ('rows', 'sum1', 'sum2', 'crc32'):
+            if digest[key] != expected[key]:
+                problems.append(f"{key} differs from the manifest")
+    return problems
+
+
+def write_manifest(file1, file2, output, tasks, lengths, digests=None, workers=None):
+    """
+    Writes output.digest.json with the partitions, the per-chunk digests and the totals.
+
+    Args:
+        digests (list): ChunkDigest results the workers returned, in chunk order. Chunks
+            without one (None, e.g. taken from a cache) are digested here by re-reading them.
+    """
+    digests = list(digests or [None] * len(tasks))
+    missing = [i for i, digest in enumerate(digests) if digest is None]
+    if missing:
+        jobs = _jobs(file1, file2, output, tasks, lengths)
+        for i, digest in zip(missing, run_ordered(digest_chunk, [jobs[i] for i in missing], workers)):
+            digests[i] = digest
+    manifest = {
+        'inputs': [fingerprint(file1), fingerprint(file2)],
+        'output': os.path.abspath(output),
+        'tasks': [list(task) for task in tasks],
+        'chunks': digests,
+        'totals': {
+            'rows': sum(d['rows'] for d in digests),
+            'bytes': sum(lengths),
+            'sum_inputs': sum(d['sum1'] + d['sum2'] for d in digests) & MASK,
+            'sum_outputs': sum(d['sum_out'] for d in digests) & MASK,
+        },
+    }
+    with open(digest_path(output) + '.tmp', 'w') as f:
+        json.dump(manifest, f)
+    os.replace(digest_path(output) + '.tmp', digest_path(output))
+    return manifest
+
+
+def verify_output(output, workers=None):
+    """
+    Recomputes every chunk digest from the inputs and the output with the recorded partitions.
+
+    Returns:
+        list: (chunk index, task, output byte range, problems) for every chunk that fails,
+        an empty list when the output checks out.
+    """
+    with open(digest_path(output)) as f:
+        manifest = json.load(f)
+    file1, file2 = (entry['path'] for entry in manifest['inputs'])
+    lengths = [chunk['bytes'] for chunk in manifest['chunks']]
+    failures = []
+    if os.path.getsize(output) != sum(lengths):
+        failures.append((None, None, (0, os.path.getsize(output)),
+                         [f"output is {os.path.getsize(output)} bytes, the manifest says {sum(lengths)}"]))
+
+    jobs = _jobs(file1, file2, output, manifest['tasks'], lengths)
+    digests = run_ordered(digest_chunk, jobs, workers)
+    for job, digest, expected in zip(jobs, digests, manifest['chunks']):
+        problems = chunk_problems(digest, expected)
+        if problems:
+            task, start, length = job[3], job[4], job[5]
+            failures.append((task[0], task, (start, start + length), problems))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify totalfile2.txt against its inputs without recomputing it.")
+    parser.add_argument('output', nargs='?', default='totalfile2.txt')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    if not os.path.exists(digest_path(args.output)):
+        parser.error(f"no {digest_path(args.output)}, run the pipeline in byte-range mode with WRITE_MANIFEST = True")
+
+    start = time.time()
+    failures = verify_output(args.output, args.workers)
+    end = time.time()
+    for index, task, (first, last), problems in failures:
+        where = "whole file" if index is None else \
+            f"chunk {index} (input bytes {task[1]}/{task[2]}, {task[3]} lines), output bytes {first}-{last}"
+        print(f"{where}: {'; '.join(problems)}")
+    print(f"{'FAILED' if failures else 'OK'}: verification took {end - start:.2f} seconds")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import os
+import time
+import argparse
+import numpy as np
+from multiprocessing import Pool, cpu_count
+from numpy_add import format_ints, POW10
+from assemble import chunk_offsets
+
+# Rows per generated block. Each block has its own random stream keyed by (seed, block number),
+# so the output depends on the seed and this value - never on the number of workers.
+BLOCK_ROWS = 1_000_000
+
+
+def block_values(seed, block, rows, low, high):
+    """Random values for one block, always the same for the same (seed, block)."""
+    stream = np.random.SeedSequence(seed, spawn_key=(block,))
+    rng = np.random.default_rng(stream)
+    count = min(BLOCK_ROWS, rows - block * BLOCK_ROWS)
+    return rng.integers(low, high, size=count, endpoint=True, dtype=np.int64)
+
+
+def _text_length(args):
+    """Worker: byte length of one block once formatted, without formatting it."""
+    values = block_values(*args)
+    digits = np.searchsorted(POW10[1:], np.abs(values), side='right') + 1
+    return int(digits.sum()) + int((values < 0).sum()) + len(values)  # + '-' signs and newlines
+
+
+def _write_text_block(args):
+    """Worker: format one block and write it straight to its final offset in the pre-sized output."""
+    output, offset, seed, block, rows, low, high = args
+    data = memoryview(format_ints(block_values(seed, block, rows, low, high)))
+    with open(output, 'r+b') as f:
+        if not hasattr(os, 'pwrite'):
+            # Windows has no positional I/O, every worker has its own file object so seeking is safe
+            f.seek(offset)
+            f.write(data)
+            return
+        written = 0
+        while written < len(data):
+            written += os.pwrite(f.fileno(), data[written:], offset + written)
+
+
+def _write_npy_block(args):
+    """Worker: write one block into its rows of the memmapped .npy column."""
+    output, seed, block, rows, low, high = args
+    column = np.load(output, mmap_mode='r+')
+    start = block * BLOCK_ROWS
+    values = block_values(seed, block, rows, low, high)
+    column[start:start + len(values)] = values
+    column.flush()
+
+
+def generate(output, rows, seed, low=1, high=100000, workers=None, fmt='text'):
+    """
+    Writes rows random integers in [low, high] to output, one block per task.
+
+    Args:
+        output (str): File to create.
+        rows (int): Number of rows.
+        seed (int): Seed for the whole file.
+        low (int): Smallest value.
+        high (int): Largest value.
+        workers (int): Worker processes, defaults to cpu_count().
+        fmt (str): 'text' for one number per line or 'npy' for an int32 .npy column.
+    """
+    workers = workers or cpu_count()
+    blocks = [(seed, block, rows, low, high) for block in range(-(-rows // BLOCK_ROWS))]
+
+    with Pool(processes=max(1, min(len(blocks), workers))) as pool:
+        if fmt == 'npy':
+            np.lib.format.open_memmap(output, mode='w+', dtype=np.int32, shape=(rows,)).flush()
+            pool.map(_write_npy_block, [(output,) + block for block in blocks])
+            return
+
+        # First pass: sizes from digit counts, nothing formatted; a prefix sum gives every block its
+        # final offset. Blocks are written in place, so the output is written once, with no temp copies
+        offsets = chunk_offsets(pool.map(_text_length, blocks))
+        with open(output, 'wb') as f:
+            f.truncate(offsets[-1])
+        pool.map(_write_text_block, [(output, offset) + block for offset, block in zip(offsets, blocks)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a file of random integers, one per line.")
+    parser.add_argument('output', nargs='?', default='hugefile1.txt')
+    parser.add_argument('--rows', type=int, default=1_000_000_000)
+    parser.add_argument('--seed', type=int, default=None, help="random if not given (printed for reuse)")
+    parser.add_argument('--low', type=int, default=1)
+    parser.add_argument('--high', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: cpu_count)")
+    parser.add_argument('--format', choices=['text', 'npy'], default='text')
+    args = parser.parse_args()
+
+    if args.format == 'npy' and not (np.iinfo(np.int32).min < args.low and args.high <= np.iinfo(np.int32).max):
+        parser.error("--format npy stores int32 values")
+    seed = args.seed if args.seed is not None else np.random.SeedSequence().entropy
+    print(f"Generating {args.rows} rows into {args.output} with seed {seed}")
+
+    start_time = time.time()
+    generate(args.output, args.rows, seed, args.low, args.high, args.workers, args.format)
+    end_time = time.time()
+    print(f"Execution took: {end_time - start_time} seconds")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+import os
+import json
+import math
+import time
+import random
+import argparse
+import tempfile
+from collections import Counter
+from multiprocessing import Pool, cpu_count
+import numpy as np
+from numpy_add import aligned_blocks, parse_lines
+from partition import partition_files
+from scheduler import choose_task_count
+
+MAX_VALUE = 200_000  # pynumbers.py writes 1-100000, sums of two files stay below this
+PERCENTILES = [1, 5, 25, 50, 75, 95, 99]
+
+
+def _block_values(block):
+    """Valid values of one block, plus how many lines were blank or invalid."""
+    try:
+        values, valid = parse_lines(block)
+        return values[valid], int((~valid).sum())
+    except OverflowError:
+        # Values beyond int64 go through int(), the rest of the block with them
+        values = []
+        skipped = 0
+        for line in block.split(b'\n')[:-1]:
+            try:
+                values.append(int(line))
+            except ValueError:
+                skipped += 1
+        return values, skipped
+
+
+def histogram_range(job):
+    """
+    Worker: counting histogram of one partition of a file. Values inside 0..max_value go
+    into a fixed-size bincount, anything outside is counted exactly in a Counter.
+
+    Returns:
+        tuple: (histogram array, outlier Counter, number of skipped lines)
+    """
+    path, (index, (start,), line_count), max_value = job
+    histogram = np.zeros(max_value + 1, dtype=np.int64)
+    outliers = Counter()
+    skipped = 0
+    with open(path, 'rb') as f:
+        f.seek(start)
+        for (block,) in aligned_blocks([f], line_count):
+            values, bad = _block_values(block)
+            skipped += bad
+            if isinstance(values, list):
+                # Only the values outside 0..max_value are outliers, the others still go in the bincount
+                outliers.update(value for value in values if not 0 <= value <= max_value)
+                values = np.array([value for value in values if 0 <= value <= max_value], dtype=np.int64)
+            inside = (values >= 0) & (values <= max_value)
+            histogram += np.bincount(values[inside], minlength=max_value + 1)
+            if not inside.all():
+                outliers.update(values[~inside].tolist())
+    return histogram, outliers, skipped
+
+
+def reduce_file(path, max_value=MAX_VALUE, workers=None, units=None):
+    """
+    Builds the histogram of a whole file in one parallel pass over the same byte-range
+    partitions multi_add*.py use; partial histograms are summed as workers finish.
+
+    Returns:
+        tuple: (histogram array, outlier Counter, number of skipped lines)
+    """
+    workers = workers or cpu_count()
+    units = units or choose_task_count(os.path.getsize(path), workers)
+    jobs = [(path, task, max_value) for task in partition_files([path], units)]
+
+    histogram = np.zeros(max_value + 1, dtype=np.int64)
+    outliers = Counter()
+    skipped = 0
+    with Pool(processes=min(workers, len(jobs))) as pool:
+        for part, part_outliers, part_skipped in pool.imap_unordered(histogram_range, jobs):
+            histogram += part
+            outliers.update(part_outliers)
+            skipped += part_skipped
+    return histogram, outliers, skipped
+
+
+def quantile(histogram, outliers, rank):
+    """Value of the rank-th smallest element (1-based) of histogram plus outliers."""
+    below = sorted(value for value in outliers if value < 0)
+    above = sorted(value for value in outliers if value >= len(histogram))
+    for value in below:
+        rank -= outliers[value]
+        if rank <= 0:
+            return value
+    counts = np.cumsum(histogram)
+    if counts[-1] >= rank:
+        return int(np.searchsorted(counts, rank))
+    rank -= int(counts[-1])
+    for value in above:
+        rank -= outliers[value]
+        if rank <= 0:
+            return value
+    raise ValueError("rank is larger than the number of values")
+
+
+def summarize(histogram, outliers, skipped, percentiles=PERCENTILES):
+    """Exact count, sum, min, max, mean, distinct values and nearest-rank percentiles."""
+    nonzero = np.flatnonzero(histogram)
+    count = int(histogram.sum()) + sum(outliers.values())
+    stats = {'count': count, 'skipped': skipped}
+    if count == 0:
+        return stats
+    total = int(np.dot(nonzero, histogram[nonzero])) + sum(value * n for value, n in outliers.items())
+    candidates = list(outliers)
+    if len(nonzero):
+        candidates += [int(nonzero[0]), int(nonzero[-1])]
+    stats.update({
+        'sum': total,
+        'min': min(candidates),
+        'max': max(candidates),
+        'mean': total / count,
+        'distinct': len(nonzero) + len(outliers),
+        'percentiles': {f"{p:g}": quantile(histogram, outliers, max(1, math.ceil(p / 100 * count)))
+                        for p in percentiles},
+    })
+    return stats
+
+
+def check(max_value=100, lines=20_000, seed=1):
+    """
+    Compares reduce_file/summarize with plain Python on a file whose blocks mix values
+    inside 0..max_value with negative, large and beyond-int64 ones, blanks and invalid lines.
+    """
+    rng = random.Random(seed)
+    choices = [lambda: rng.randint(0, max_value)] * 6 + [
+        lambda: rng.randint(-50, -1), lambda: rng.randint(max_value + 1, 10 * max_value),
+        lambda: rng.choice([10 ** 19, -10 ** 19, 2 ** 63]), lambda: '', lambda: 'x1']
+    rows = [rng.choice(choices)() for _ in range(lines)]
+    rows[lines // 2:] = [row for row in rows[lines // 2:] if not isinstance(row, int) or abs(row) < 2 ** 63]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'mixed.txt')
+        with open(path, 'w') as f:
+            f.write(''.join(f"{row}\n" for row in rows))
+        stats = summarize(*reduce_file(path, max_value, workers=2, units=4), PERCENTILES)
+
+    values = sorted(row for row in rows if isinstance(row, int))
+    expected = {'count': len(values), 'skipped': len(rows) - len(values), 'sum': sum(values),
+                'min': values[0], 'max': values[-1], 'distinct': len(set(values)),
+                'percentiles': {f"{p:g}": values[max(1, math.ceil(p / 100 * len(values))) - 1]
+                                for p in PERCENTILES}}
+    for key, value in expected.items():
+        assert stats[key] == value, f"{key}: {stats[key]} != {value}"
+    print(f"Histogram matches plain Python on {lines} mixed lines")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exact aggregates and percentiles of files of integers, in parallel.")
+    parser.add_argument('files', nargs='*')
+    parser.add_argument('--max-value', type=int, default=MAX_VALUE, help="top of the histogram domain")
+    parser.add_argument('--percentiles', type=float, nargs='+', default=PERCENTILES)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    parser.add_argument('--check', action='store_true', help="compare against plain Python on generated mixed input")
+    args = parser.parse_args()
+
+    if args.check:
+        check()
+        return
+    if not args.files:
+        parser.error("give at least one file, or --check")
+
+    results = {}
+    for path in args.files:
+        start = time.time()
+        histogram, outliers, skipped = reduce_file(path, args.max_value, args.workers)
+        results[path] = summarize(histogram, outliers, skipped, args.percentiles)
+        results[path]['seconds'] = time.time() - start
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for path, stats in results.items():
+        print(f"{path}: {stats['count']:,} values, {stats['skipped']:,} blank/invalid lines skipped "
+              f"({stats['seconds']:.2f} seconds)")
+        if stats['count']:
+            print(f"  sum {stats['sum']:,}  min {stats['min']:,}  max {stats['max']:,}  "
+                  f"mean {stats['mean']:.4f}  distinct {stats['distinct']:,}")
+            print('  ' + '  '.join(f"p{p} {value:,}" for p, value in stats['percentiles'].items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+import os
+import json
+import zlib
+import time
+import shutil
+import argparse
+from partition import BLOCK_SIZE, add_range_pair, find_line_offsets
+from numpy_add import add_range_pair_numpy
+from assemble import assemble_outputs
+from scheduler import choose_task_count, run_ordered
+
+TAIL_WINDOW = 1024 * 1024  # bytes before the processed offset whose checksum must not change
+STATE_SUFFIX = '.state.json'  # next to the output: offsets and row count already processed
+
+
+def state_path(output):
+    return output + STATE_SUFFIX
+
+
+def tail_checksum(path, end, window=TAIL_WINDOW):
+    """CRC-32 of the window bytes of path that end at offset end."""
+    start = max(0, end - window)
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return f"{zlib.crc32(f.read(end - start)):08x}"
+
+
+def load_state(output):
+    try:
+        with open(state_path(output)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_state(output, state):
+    with open(state_path(output) + '.tmp', 'w') as f:
+        json.dump(state, f)
+    os.replace(state_path(output) + '.tmp', state_path(output))
+
+
+def new_state(input_files):
+    return {'inputs': [{'path': os.path.abspath(p), 'offset': 0, 'crc32': tail_checksum(p, 0)} for p in input_files],
+            'rows': 0, 'output_bytes': 0, 'output_crc32': None}
+
+
+def prefix_problem(state, input_files, output):
+    """Why the saved state can't be continued from (inputs rewritten, output changed), or None."""
+    if [entry['path'] for entry in state['inputs']] != [os.path.abspath(p) for p in input_files]:
+        return "different input files"
+    for entry in state['inputs']:
+        if not os.path.exists(entry['path']) or os.path.getsize(entry['path']) < entry['offset']:
+            return f"{entry['path']} is shorter than what was already processed"
+        if tail_checksum(entry['path'], entry['offset']) != entry['crc32']:
+            return f"{entry['path']} changed before the processed offset"
+    if not os.path.exists(output) or os.path.getsize(output) < state['output_bytes']:
+        return f"{output} is missing or shorter than recorded"
+    if state['output_bytes'] and tail_checksum(output, state['output_bytes']) != state['output_crc32']:
+        return f"{output} changed"
+    return None
+
+
+def complete_lines(path, start):
+    """Newline-terminated lines after start, and the offset right after the last of them."""
+    lines = 0
+    end = start
+    pos = start
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                break
+            lines += block.count(b'\n')
+            last = block.rfind(b'\n')
+            if last != -1:
+                end = pos + last + 1
+            pos += len(block)
+    return lines, end
+
+
+def _add_task(job):
+    """Worker: one chunk of the appended rows into its own file, returns its byte length."""
+    file1, file2, task, chunk_path, use_numpy = job
+    if use_numpy:
+        add_range_pair_numpy(file1, file2, task, chunk_path)
+    else:
+        add_range_pair(file1, file2, task, chunk_path)
+    return os.path.getsize(chunk_path)
+
+
+def add_incremental(input1, input2, output, use_numpy=False, workers=None, units=None):
+    """
+    Adds only the rows appended to input1/input2 since the last run and appends their sums
+    to output. Only complete rows (newline-terminated in both inputs) are taken, so a row
+    that is still being written is picked up next time. When the inputs were rewritten
+    or the output was touched the whole result is rebuilt.
+
+    Returns:
+        tuple: (rows added this run, total rows in output, reason for a rebuild or None)
+    """
+    state = load_state(output)
+    problem = "no saved state" if state is None else prefix_problem(state, [input1, input2], output)
+    if problem is not None:
+        state = new_state([input1, input2])
+    starts = [entry['offset'] for entry in state['inputs']]
+
+    counts = [complete_lines(path, start) for path, start in zip([input1, input2], starts)]
+    rows = min(count for count, _ in counts)
+    if rows == 0 and problem is None:
+        return 0, state['rows'], None
+
+    # Partition just the new rows the way multi_add does, so the work scales with the appended data
+    new_bytes = sum(end - start for (_, end), start in zip(counts, starts))
+    units = max(1, min(rows, units or choose_task_count(new_bytes, workers)))
+    lines_per_chunk = -(-rows // units) if rows else 1
+    line_starts = list(range(0, rows, lines_per_chunk))
+    offsets = [find_line_offsets(path, line_starts + [rows], start)
+               for path, start in zip([input1, input2], starts)]
+    tasks = [(i, offsets[0][i], offsets[1][i], min(lines_per_chunk, rows - first))
+             for i, first in enumerate(line_starts)]
+
+    parts_dir = output + '.parts'
+    os.makedirs(parts_dir, exist_ok=True)
+    try:
+        chunk_paths = [os.path.join(parts_dir, f"out_chunk_{task[0]}.txt") for task in tasks]
+        jobs = [(input1, input2, task, path, use_numpy) for task, path in zip(tasks, chunk_paths)]
+        if len(jobs) == 1:
+            lengths = [_add_task(jobs[0])]
+        else:
+            lengths = run_ordered(_add_task, jobs, workers)
+        # Anything past output_bytes is from a run that died before saving its state
+        assemble_outputs(chunk_paths, output, lengths, start_offset=state['output_bytes'])
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+    for entry, path, offset in zip(state['inputs'], [input1, input2], [o[-1] for o in offsets]):
+        entry['offset'] = offset
+        entry['crc32'] = tail_checksum(path, offset)
+    state['rows'] += rows
+    state['output_bytes'] += sum(lengths)
+    state['output_crc32'] = tail_checksum(output, state['output_bytes'])
+    save_state(output, state)
+    return rows, state['rows'], problem
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add only the rows appended since the last run.")
+    parser.add_argument('input1', nargs='?', default='hugefile1.txt')
+    parser.add_argument('input2', nargs='?', default='hugefile2.txt')
+    parser.add_argument('output', nargs='?', default='totalfile2.txt')
+    parser.add_argument('--numpy', action='store_true', help="use the vectorized NumPy kernel")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.time()
+    added, total, rebuilt = add_incremental(args.input1, args.input2, args.output, args.numpy, args.workers)
+    if rebuilt:
+        print(f"Rebuilt {args.output} from the start ({rebuilt})")
+    print(f"Added {added} rows, {args.output} now covers {total} rows")
+    print(f"Processing took {time.time() - start:.2f} seconds")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import os
+import mmap
+import time
+import argparse
+from multiprocessing import Pool, cpu_count
+import numpy as np
+import tracing
+
+BLOCK_SIZE = 16 * 1024 * 1024  # bytes compared per NumPy call
+RANGE_BYTES = 64 * 1024 * 1024  # bytes per worker task when no chunk count is asked for
+PARALLEL_MIN_BYTES = 64 * 1024 * 1024  # smaller files are counted in this process, a pool costs more
+
+
+def _scan_range(job):
+    """
+    Worker: newlines in file[start:end], where the first line starting inside the range begins
+    (None if no line does), and whether the range ends with a newline.
+    """
+    path, start, end = job
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        newlines = 0
+        for pos in range(start, end, BLOCK_SIZE):
+            # A view of the map, nothing is copied; ~3x faster than bytes.count on a slice
+            view = np.frombuffer(mapped, dtype=np.uint8, count=min(BLOCK_SIZE, end - pos), offset=pos)
+            newlines += int(np.count_nonzero(view == ord('\n')))
+            del view  # the map can't close while a view is exported
+        if start == 0 or mapped[start - 1] == ord('\n'):
+            first = start
+        else:
+            found = mapped.find(b'\n', start, end - 1)  # a newline at end - 1 starts the next range
+            first = found + 1 if found != -1 else None
+        return newlines, first, mapped[end - 1] == ord('\n')
+
+
+@tracing.traced()
+def count_lines_parallel(file_path, workers=None, chunks=None, boundaries=False):
+    """
+    Counts lines the way partition.count_lines does (a last line without '\\n' counts too)
+    by mapping the file and counting newlines of its byte ranges in parallel workers.
+    Replaces `wc -l` and line-by-line counting, with no shell or external binary.
+
+    Args:
+        file_path (str): File to count.
+        workers (int): Worker processes, defaults to cpu_count().
+        chunks (int): Byte ranges to cut the file into, defaults to one per RANGE_BYTES.
+        boundaries (bool): Also return the ranges moved to line starts.
+
+    Returns:
+        int: Number of lines. With boundaries=True a (lines, tasks) tuple, tasks being the
+        (index, (start_offset,), line_count) tuples of partition.partition_files for about
+        equal-sized newline-aligned chunks, found in the same pass.
+    """
+    size = os.path.getsize(file_path)
+    if size == 0:
+        return (0, []) if boundaries else 0
+    workers = workers or cpu_count()
+    chunks = max(1, min(size, chunks or max(workers, -(-size // RANGE_BYTES))))
+    edges = [size * i // chunks for i in range(chunks + 1)]
+    jobs = [(file_path, start, end) for start, end in zip(edges, edges[1:]) if start < end]
+    tracing.count(bytes_in=size)
+
+    if size < PARALLEL_MIN_BYTES or workers == 1:
+        results = [_scan_range(job) for job in jobs]
+    else:
+        with Pool(processes=min(workers, len(jobs))) as pool:
+            results = pool.map(_scan_range, jobs)
+
+    newlines = sum(result[0] for result in results)
+    total = newlines if results[-1][2] else newlines + 1
+    if not boundaries:
+        return total
+
+    # A line starting at first > start comes right after the range's first newline,
+    # so the lines before it are the newlines of every earlier range plus that one
+    starts = []
+    seen = 0
+    for (_, start, _), (count, first, _) in zip(jobs, results):
+        if first is not None and first < size:
+            starts.append((first, seen + (first > start)))
+        seen += count
+    tasks = [(index, (offset,), end_line - line)
+             for index, ((offset, line), (_, end_line)) in enumerate(zip(starts, starts[1:] + [(size, total)]))]
+    return total, tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count lines in parallel, without wc -l.")
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunks', type=int, default=None, help="also print this many newline-aligned chunks")
+    args = parser.parse_args()
+
+    for path in args.files:
+        start = time.time()
+        if args.chunks:
+            total, tasks = count_lines_parallel(path, args.workers, args.chunks, boundaries=True)
+        else:
+            total, tasks = count_lines_parallel(path, args.workers), []
+        seconds = time.time() - start
+        print(f"{total} {path} ({os.path.getsize(path) / 1024 ** 2 / max(seconds, 1e-9):.0f} MB/s)")
+        for index, (offset,), line_count in tasks:
+            print(f"  chunk {index}: byte {offset}, {line_count} lines")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+import os
+import struct
+from array import array
+from partition import BLOCK_SIZE, nth_newline
+
+STRIDE = 65536  # Record the byte offset of every STRIDE-th line
+
+# Sidecar layout: magic, stride, file size, mtime (ns), total lines, then int64 offsets
+MAGIC = b'CSCIDX01'
+HEADER = struct.Struct('<8sqqqq')
+
+
+class LineIndex:
+    """Sparse line-offset index: offsets[i] is where line i * stride starts."""
+
+    def __init__(self, stride, size, mtime_ns, total_lines, offsets):
+        self.stride = stride
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.total_lines = total_lines
+        self.offsets = offsets
+
+    def nearest(self, line):
+        """Returns (line number, byte offset) of the closest indexed line at or before line."""
+        slot = min(line // self.stride, len(self.offsets) - 1)
+        return slot * self.stride, self.offsets[slot]
+
+    def line_offset(self, file_path, line):
+        """Byte offset where line starts: one lookup plus a scan of at most stride lines."""
+        if line >= self.total_lines:
+            return self.size
+        indexed_line, offset = self.nearest(line)
+        remaining = line - indexed_line
+        with open(file_path, 'rb') as f:
+            while remaining:
+                f.seek(offset)
+                block = f.read(BLOCK_SIZE)
+                newlines = block.count(b'\n')
+                if newlines >= remaining:
+                    return offset + nth_newline(block, remaining) + 1
+                remaining -= newlines
+                offset += len(block)
+        return offset
+
+
+def index_path(file_path):
+    return file_path + '.idx'
+
+
+def _fingerprint(file_path):
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def build_index(file_path, stride=STRIDE):
+    """
+    Scans the file once and writes the sidecar index next to it.
+
+    Args:
+        file_path (str): File to index.
+        stride (int): Lines between recorded offsets.
+
+    Returns:
+        LineIndex: The freshly built index.
+    """
+    size, mtime_ns = _fingerprint(file_path)
+    offsets = array('q', [0])
+    next_line = stride  # next line number whose offset gets recorded
+    lines_seen = 0
+    block_start = 0
+    last = b'\n'
+
+    with open(file_path, 'rb') as f:
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                break
+            newlines = block.count(b'\n')
+            pos = -1
+            found = 0
+            while next_line <= lines_seen + newlines:
+                pos = nth_newline(block, next_line - lines_seen - found, pos + 1)
+                found = next_line - lines_seen
+                offsets.append(block_start + pos + 1)
+                next_line += stride
+            lines_seen += newlines
+            block_start += len(block)
+            last = block[-1:]
+
+    total_lines = lines_seen + (1 if last != b'\n' else 0)
+    # An offset recorded right at end of file does not start a line
+    if len(offsets) > 1 and offsets[-1] >= size:
+        offsets.pop()
+
+    index = LineIndex(stride, size, mtime_ns, total_lines, offsets)
+    save_index(file_path, index)
+    return index
+
+
+def save_index(file_path, index):
+    # Write to a temp file first so a crash never leaves a half-written index behind
+    tmp_path = index_path(file_path) + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, index.stride, index.size, index.mtime_ns, index.total_lines))
+        index.offsets.tofile(f)
+    os.replace(tmp_path, index_path(file_path))
+
+
+def load_index(file_path):
+    """Loads the sidecar index, or returns None if it is missing, corrupt or stale."""
+    path = index_path(file_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+        if len(header) != HEADER.size:
+            return None
+        magic, stride, size, mtime_ns, total_lines = HEADER.unpack(header)
+        if magic != MAGIC or (size, mtime_ns) != _fingerprint(file_path):
+            return None
+        offsets = array('q')
+        offsets.frombytes(f.read())
+    if not offsets:
+        return None
+    return LineIndex(stride, size, mtime_ns, total_lines, offsets)
+
+
+def get_index(file_path, stride=STRIDE):
+    """Returns a current index for file_path, rebuilding the sidecar only when needed."""
+    index = load_index(file_path)
+    if index is None:
+        index = build_index(file_path, stride)
+    return index
+
+
+def main():
+    import sys
+    import time
+
+    for file_path in sys.argv[1:]:
+        start = time.time()
+        index = build_index(file_path)
+        print(f"{file_path}: {index.total_lines} lines, {len(index.offsets)} offsets "
+              f"written to {index_path(file_path)} in {time.time() - start:.2f} seconds")
+
+
+if __name__ == '__main__':
+    main()
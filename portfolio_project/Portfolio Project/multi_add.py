@@ -2,8 +2,23 @@ import os
 import time
 import shutil
 from multiprocessing import Pool, cpu_count, Process
+from partition import partition_pair, add_range_pair
+from numpy_add import add_range_pair_numpy
+from assemble import assemble_outputs
+from scheduler import choose_task_count, run_ordered
+import tracing
+from digest import ChunkDigest, write_manifest, digest_path
+from incremental import add_incremental
+import chunk_cache
+from line_count import count_lines_parallel
 
 CHUNKS = 10  # Adjusted for 4-core VM
+USE_BYTE_RANGES = True  # Seek into the original files instead of writing split copies
+USE_NUMPY = False  # Parse, add and format whole blocks with NumPy (byte-range mode only)
+ADAPTIVE_CHUNKS = True  # Byte-range mode: size the work units from file size and cpu_count, not CHUNKS
+WRITE_MANIFEST = True  # Byte-range mode: per-chunk digests for digest.py, computed by the workers as they add
+INCREMENTAL = False  # Only add the rows appended since the last incremental run (see incremental.py)
+USE_CACHE = False  # Reuse out_chunk results of unchanged input chunks from earlier runs (see chunk_cache.py)
 
 FILE1 = 'hugefile1.txt'
 FILE2 = 'hugefile2.txt'
@@ -22,12 +37,13 @@ def clean_dirs():
     #     os.remove(FINAL_OUTPUT)
 
 
+@tracing.traced()
 def split_file_streaming(file_path, output_dir, chunks):
+    tracing.annotate(file=file_path)
     os.makedirs(output_dir, exist_ok=True)
 
-    # First count lines to determine chunk size
-    with open(file_path, 'r') as f:
-        total_lines = sum(1 for line in f if line.strip())
+    # First count lines to determine chunk size (newlines counted in parallel, see line_count.py)
+    total_lines = count_lines_parallel(file_path)
 
     lines_per_chunk = (total_lines + chunks - 1) // chunks  # ceiling division
 
@@ -46,8 +62,10 @@ def split_file_streaming(file_path, output_dir, chunks):
                         written += 1
 
 
+@tracing.traced(profile=True)
 def process_file_pair(index):
     """Process one chunk from each file, line-by-line add, write output."""
+    tracing.annotate(chunk=index)
     file1 = os.path.join(SPLIT_DIR1, f"chunk_{index}.txt")
     file2 = os.path.join(SPLIT_DIR2, f"chunk_{index}.txt")
     output_file = os.path.join(OUTPUT_DIR, f"out_chunk_{index}.txt")
@@ -61,54 +79,135 @@ def process_file_pair(index):
                     result = int(val1) + int(val2)
                     out.write(f"{result}\n")
                 except ValueError:
+                    tracing.count(invalid=1)
                     continue  # skip invalid lines
+            else:
+                tracing.count(blank=1)
 
+    tracing.record_output(output_file, inputs=(file1, file2))
     return output_file
 
 
-def combine_outputs(output_dir=OUTPUT_DIR, final_output=FINAL_OUTPUT):
-    with open(final_output, 'w') as outfile:
-        for i in range(CHUNKS):  # enforce chunk order explicitly
-            output_file = os.path.join(output_dir, f"out_chunk_{i}.txt")
-            with open(output_file, 'r') as f:
-                shutil.copyfileobj(f, outfile)  # faster than readlines + writelines
+def chunk_output_path(index):
+    return os.path.join(OUTPUT_DIR, f"out_chunk_{index}.txt")
+
+
+@tracing.traced(profile=True)
+def process_range_pair(task):
+    """
+    Process one byte-range chunk of the original files, write output, return its byte length
+    and its digest for the manifest (None unless WRITE_MANIFEST).
+    """
+    tracing.annotate(chunk=task[0])
+    output_file = chunk_output_path(task[0])
+    digest = ChunkDigest() if WRITE_MANIFEST else None
+    if USE_NUMPY:
+        add_range_pair_numpy(FILE1, FILE2, task, output_file, digest)
+    else:
+        add_range_pair(FILE1, FILE2, task, output_file, digest)
+    tracing.record_output(output_file)
+    return os.path.getsize(output_file), digest.result() if digest else None
+
+
+@tracing.traced()
+def combine_outputs(output_dir=OUTPUT_DIR, final_output=FINAL_OUTPUT, chunks=CHUNKS, lengths=None):
+    tracing.annotate(chunks=chunks)
+    # Chunks are copied straight to their final offsets (see assemble.py), in chunk order
+    chunk_paths = [os.path.join(output_dir, f"out_chunk_{i}.txt") for i in range(chunks)]
+    assemble_outputs(chunk_paths, final_output, lengths)
 
 
+@tracing.traced()
 def parallel_process_file_pairs():
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     indices = list(range(CHUNKS))
+    if USE_CACHE:
+        # Copy the results of unchanged chunk pairs out of the cache, process only the misses
+        keys, indices = chunk_cache.lookup(
+            chunk_cache.files_key,
+            [(os.path.join(SPLIT_DIR1, f"chunk_{i}.txt"), os.path.join(SPLIT_DIR2, f"chunk_{i}.txt")) for i in indices],
+            [chunk_output_path(i) for i in indices])
     with Pool(processes=min(CHUNKS, cpu_count())) as pool:
         pool.map(process_file_pair, indices)
+    if USE_CACHE:
+        for index in indices:
+            chunk_cache.store(keys[index], chunk_output_path(index))
 
 
-def main():
-    start = time.time()
-    print(f"Splitting input files into {CHUNKS} parts...")
+@tracing.traced()
+def parallel_process_ranges(tasks):
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    if not USE_CACHE:
+        # Many small units handed out as workers free up, lengths and digests come back in chunk order
+        results = run_ordered(process_range_pair, tasks)
+        return [length for length, _ in results], [digest for _, digest in results]
+
+    keys, misses = chunk_cache.lookup(chunk_cache.range_key, [(FILE1, FILE2, task) for task in tasks],
+                                      [chunk_output_path(task[0]) for task in tasks])
+    missed = set(misses)
+    lengths = [None if i in missed else os.path.getsize(chunk_output_path(task[0])) for i, task in enumerate(tasks)]
+    digests = [None] * len(tasks)  # cached chunks are digested from disk by write_manifest
+    for position, (length, digest) in zip(misses, run_ordered(process_range_pair, [tasks[i] for i in misses])):
+        lengths[position] = length
+        digests[position] = digest
+        chunk_cache.store(keys[position], chunk_output_path(tasks[position][0]))
+    return lengths, digests
 
-    p1 = Process(target=split_file_streaming, args=(FILE1, SPLIT_DIR1, CHUNKS))
-    p2 = Process(target=split_file_streaming, args=(FILE2, SPLIT_DIR2, CHUNKS))
 
-    p1.start()
-    p2.start()
-    p1.join()
-    p2.join()
+def main():
+    start = time.time()
+    if INCREMENTAL:
+        added, total, rebuilt = add_incremental(FILE1, FILE2, FINAL_OUTPUT, USE_NUMPY)
+        if rebuilt:
+            print(f"Rebuilt {FINAL_OUTPUT} from the start ({rebuilt})")
+        print(f"Done. Added {added} rows ({total} in total) in {time.time() - start:.2f} seconds")
+        return
+    chunks = CHUNKS
+    if USE_BYTE_RANGES:
+        # Only compute where each chunk starts, the inputs are never rewritten
+        units = CHUNKS
+        if ADAPTIVE_CHUNKS:
+            units = choose_task_count(os.path.getsize(FILE1) + os.path.getsize(FILE2))
+        print(f"Partitioning input files into {units} byte ranges...")
+        with tracing.stage('partition_pair', units=units):
+            tasks = partition_pair(FILE1, FILE2, units)
+        chunks = len(tasks)
+    else:
+        print(f"Splitting input files into {CHUNKS} parts...")
+
+        p1 = Process(target=split_file_streaming, args=(FILE1, SPLIT_DIR1, CHUNKS))
+        p2 = Process(target=split_file_streaming, args=(FILE2, SPLIT_DIR2, CHUNKS))
+
+        p1.start()
+        p2.start()
+        p1.join()
+        p2.join()
     end = time.time()
     print(f"Splitting took {end - start:.2f} seconds")
 
     p_start = time.time()
     print("Processing file chunks in parallel...")
-    parallel_process_file_pairs()
+    lengths = None
+    if USE_BYTE_RANGES:
+        lengths, digests = parallel_process_ranges(tasks)
+    else:
+        parallel_process_file_pairs()
     p_end = time.time()
     print(f"Processing took {p_end - p_start:.2f} seconds")
 
     c_start = time.time()
     print("Combining output files into final result...")
-    combine_outputs()
+    combine_outputs(chunks=chunks, lengths=lengths)
     final_end = time.time()
     print(f"Combining took {final_end - c_start:.2f} seconds")
+    if USE_BYTE_RANGES and WRITE_MANIFEST:
+        write_manifest(FILE1, FILE2, FINAL_OUTPUT, tasks, lengths, digests)
+        print(f"Digest manifest written to {digest_path(FINAL_OUTPUT)} in {time.time() - final_end:.2f} seconds")
     print(f"\nTime after splitting = {final_end - p_start:.2f} seconds")
     print(f"Done. Total operations took {final_end - start:.2f} seconds")
     clean_dirs()
+    if USE_CACHE:
+        chunk_cache.evict()
 
 
 if __name__ == '__main__':
@@ -1,13 +1,31 @@
 import os
 import time
+import argparse
 import math
 import shutil
 import platform
 import subprocess
 from multiprocessing import Pool, cpu_count, Process
 from filesplit.split import Split
+from partition import partition_pair, add_range_pair
+from numpy_add import add_range_pair_numpy
+from assemble import assemble_outputs
+from scheduler import choose_task_count, run_ordered
+import tracing
+from digest import ChunkDigest, write_manifest, digest_path
+from checkpoint import (new_manifest, load_manifest, save_manifest, manifest_path, pending_tasks,
+                        mark_done, file_checksum)
+from blockcompress import CODECS, add_compressed
+from incremental import add_incremental
+from line_count import count_lines_parallel
+import chunk_cache
 
 CHUNKS = 10  # Adjust as needed for partition size
+USE_BYTE_RANGES = True  # Seek into the original files instead of writing split copies
+USE_NUMPY = False  # Parse, add and format whole blocks with NumPy (byte-range mode only)
+ADAPTIVE_CHUNKS = True  # Byte-range mode: size the work units from file size and cpu_count, not CHUNKS
+WRITE_MANIFEST = True  # Byte-range mode: per-chunk digests for digest.py, computed by the workers as they add
+USE_CACHE = False  # Reuse out_chunk results of unchanged input chunks from earlier runs (see chunk_cache.py)
 
 FILE1 = 'hugefile1.txt'
 FILE2 = 'hugefile2.txt'
@@ -23,83 +41,46 @@ def is_wsl_available():
 
 
 # Example usage
+@tracing.traced()
 def split_file_auto(file_path, output_dir):
     """
     Automatically splits a file:
+    - Counts lines in-process with parallel newline counting (line_count.py), no 'wc -l'.
     - On Windows: uses Python filesplit or WSL split.
-    - On Unix: uses 'wc -l' to count lines, calculates lines per chunk using CHUNKS.
+    - On Unix: uses Bash split with lines per chunk from CHUNKS.
       Falls back to Python method if anything fails.
 
     Args:
         file_path (str): File to split.
         output_dir (str): Where to put split files.
     """
+    total_lines = count_lines_parallel(file_path)
+    lines_per_chunk = math.ceil(total_lines / CHUNKS)
+    print(f"{file_path} has {total_lines} lines — splitting into chunks of ~{lines_per_chunk} lines.\n")
+
     if platform.system() == 'Windows':
         if is_wsl_available():
             print("Detected Windows and WSL— using WSL-based splitter.")
             try:
-                # Use wc -l to count total lines
-                result = subprocess.run(
-                    ["wsl", "-e", "bash", "-c", f"wc -l < '{file_path}'"],
-                    capture_output=True,
-                    text=True,
-                    check=True
-                )
-                total_lines = int(result.stdout.strip())
-
-                # Compute lines per chunk using global CHUNKS
-                lines_per_chunk = math.ceil(total_lines / CHUNKS)
-
-                print(f"{file_path} has {total_lines} lines — splitting into chunks of ~{lines_per_chunk} lines.\n")
                 split_file_with_wsl(file_path, output_dir, lines_per_chunk)
-
-            except (subprocess.CalledProcessError, FileNotFoundError, ValueError) as e:
-                print(f"Bash/wc error: {e}")
+            except FileNotFoundError as e:
+                print(f"WSL error: {e}")
                 print("Falling back to Python splitter...")
-                total_lines = count_lines_python(file_path)
-                lines_per_chunk = math.ceil(total_lines / CHUNKS)
-                print(f"{file_path} has {total_lines} lines — splitting into chunks of ~{lines_per_chunk} lines.\n")
                 split_file_by_fixed_lines(file_path, output_dir, lines_per_chunk)
         else:
             print("Detected Windows — using Python-based splitter.")
-            print("Counting lines...")
-            total_lines = count_lines_python(file_path)
-            lines_per_chunk = math.ceil(total_lines / CHUNKS)
-            print(f"{file_path} has {total_lines} lines — splitting into chunks of ~{lines_per_chunk} lines.\n")
             split_file_by_fixed_lines(file_path, output_dir, lines_per_chunk)
     else:
-        print("Detected Unix — using 'wc -l' + Bash split.")
+        print("Detected Unix — using Bash split.")
         try:
-            # Use wc -l to count total lines
-            result = subprocess.run(
-                ["/bin/bash", "-c", f"wc -l < '{file_path}'"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            total_lines = int(result.stdout.strip())
-
-            # Compute lines per chunk using global CHUNKS
-            lines_per_chunk = math.ceil(total_lines / CHUNKS)
-
-            print(f"{file_path} has {total_lines} lines — splitting into chunks of ~{lines_per_chunk} lines.\n")
             split_file_with_bash(file_path, output_dir, lines_per_chunk)
-
-        except (subprocess.CalledProcessError, FileNotFoundError, ValueError) as e:
-            print(f"Bash/wc error: {e}")
+        except FileNotFoundError as e:
+            print(f"Bash error: {e}")
             print("Falling back to Python splitter...")
-            total_lines = count_lines_python(file_path)
-            lines_per_chunk = math.ceil(total_lines / CHUNKS)
-            print(f"{file_path} has {total_lines} lines — splitting into chunks of ~{lines_per_chunk} lines.\n")
             split_file_by_fixed_lines(file_path, output_dir, lines_per_chunk)
 
 
-# Count lines in file, used in Windows or if wc is not found
-def count_lines_python(file_path):
-    with open(file_path, 'r') as f:
-        return sum(1 for line in f if line.strip())
-
-
+@tracing.traced()
 def split_file_with_wsl(file_path, output_dir, lines_per_chunk):
     """
     Uses Bash's 'split' command inside WSL to split a file by a fixed number of lines,
@@ -132,6 +113,7 @@ def split_file_with_wsl(file_path, output_dir, lines_per_chunk):
         os.rename(src, dst)
 
 
+@tracing.traced()
 def split_file_with_bash(file_path, output_dir, lines_per_chunk):
     """
     Uses Bash's 'split' command to split a file by a fixed number of lines,
@@ -164,6 +146,7 @@ def split_file_with_bash(file_path, output_dir, lines_per_chunk):
         os.rename(src, dst)
 
 
+@tracing.traced()
 def split_file_by_fixed_lines(file_path, output_dir, lines_per_chunk):
     """
     Splits a file into chunks based on a fixed number of lines per chunk.
@@ -201,11 +184,13 @@ def clean_dirs():
     #     os.remove(FINAL_OUTPUT)
 
 
+@tracing.traced(profile=True)
 def process_file_pair(index):
     """Process one chunk from each file, line-by-line add, write output."""
+    tracing.annotate(chunk=index)
     file1 = os.path.join(SPLIT_DIR1, f"chunk_{index}.txt")
     file2 = os.path.join(SPLIT_DIR2, f"chunk_{index}.txt")
-    output_file = os.path.join(OUTPUT_DIR, f"out_chunk_{index}.txt")
+    output_file = chunk_output_path(index)
 
     with open(file1, 'r') as f1, open(file2, 'r') as f2, open(output_file, 'w') as out:
         for line1, line2 in zip(f1, f2):
@@ -216,55 +201,195 @@ def process_file_pair(index):
                     result = int(val1) + int(val2)
                     out.write(f"{result}\n")
                 except ValueError:
+                    tracing.count(invalid=1)
                     continue  # skip invalid lines
+            else:
+                tracing.count(blank=1)
 
+    tracing.record_output(output_file, inputs=(file1, file2))
     return output_file
 
 
-def combine_outputs(output_dir=OUTPUT_DIR, final_output=FINAL_OUTPUT):
-    with open(final_output, 'w') as outfile:
-        for i in range(CHUNKS):  # enforce chunk order explicitly
-            output_file = os.path.join(output_dir, f"out_chunk_{i}.txt")
-            with open(output_file, 'r') as f:
-                shutil.copyfileobj(f, outfile)  # faster than readlines + writelines
+def chunk_output_path(index):
+    return os.path.join(OUTPUT_DIR, f"out_chunk_{index}.txt")
+
+
+@tracing.traced(profile=True)
+def process_range_pair(task):
+    """
+    Process one byte-range chunk of the original files, write output, return its byte length
+    and its digest for the manifest (None unless WRITE_MANIFEST).
+    """
+    tracing.annotate(chunk=task[0])
+    output_file = chunk_output_path(task[0])
+    digest = ChunkDigest() if WRITE_MANIFEST else None
+    if USE_NUMPY:
+        add_range_pair_numpy(FILE1, FILE2, task, output_file, digest)
+    else:
+        add_range_pair(FILE1, FILE2, task, output_file, digest)
+    tracing.record_output(output_file)
+    return os.path.getsize(output_file), digest.result() if digest else None
+
+
+def process_range_pair_checked(task):
+    """process_range_pair plus the CRC-32 of the chunk it wrote, for the run manifest."""
+    length, digest = process_range_pair(task)
+    checksum = digest['crc32'] if digest else file_checksum(chunk_output_path(task[0]))
+    return length, checksum, digest
+
+
+@tracing.traced()
+def combine_outputs(output_dir=OUTPUT_DIR, final_output=FINAL_OUTPUT, chunks=CHUNKS, lengths=None):
+    tracing.annotate(chunks=chunks)
+    # Chunks are copied straight to their final offsets (see assemble.py), in chunk order
+    chunk_paths = [os.path.join(output_dir, f"out_chunk_{i}.txt") for i in range(chunks)]
+    assemble_outputs(chunk_paths, final_output, lengths)
 
 
+@tracing.traced()
 def parallel_process_file_pairs():
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     indices = list(range(CHUNKS))
+    if USE_CACHE:
+        # Copy the results of unchanged chunk pairs out of the cache, process only the misses
+        keys, indices = chunk_cache.lookup(
+            chunk_cache.files_key,
+            [(os.path.join(SPLIT_DIR1, f"chunk_{i}.txt"), os.path.join(SPLIT_DIR2, f"chunk_{i}.txt")) for i in indices],
+            [chunk_output_path(i) for i in indices])
     with Pool(processes=min(CHUNKS, cpu_count())) as pool:
         pool.map(process_file_pair, indices)
+    if USE_CACHE:
+        for index in indices:
+            chunk_cache.store(keys[index], chunk_output_path(index))
+
+
+@tracing.traced()
+def parallel_process_ranges(manifest):
+    """
+    Processes every chunk the manifest doesn't list as done (or whose output no longer
+    matches its checksum), recording each one as it finishes so a crashed run can resume.
+    Returns the byte length of every chunk and the digests of the chunks processed in this
+    run (None for the others), in chunk order.
+    """
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    todo = pending_tasks(manifest, chunk_output_path)
+    save_manifest(OUTPUT_DIR, manifest)
+    done = len(manifest['tasks']) - len(todo)
+    if done:
+        print(f"{done} of {len(manifest['tasks'])} chunks already done, processing the other {len(todo)}")
+
+    if USE_CACHE and todo:
+        # Cached chunks count as done right away, only the misses go to the workers
+        key_list, misses = chunk_cache.lookup(chunk_cache.range_key, [(FILE1, FILE2, task) for task in todo],
+                                              [chunk_output_path(task[0]) for task in todo])
+        keys = {task[0]: key for task, key in zip(todo, key_list)}
+        missed = set(misses)
+        for position, task in enumerate(todo):
+            if position not in missed:
+                output_file = chunk_output_path(task[0])
+                mark_done(OUTPUT_DIR, manifest, task[0], os.path.getsize(output_file), file_checksum(output_file))
+        todo = [todo[i] for i in misses]
+
+    digests = {}
+
+    def on_result(task, result):
+        length, checksum, digests[task[0]] = result
+        mark_done(OUTPUT_DIR, manifest, task[0], length, checksum)
+        if USE_CACHE:
+            chunk_cache.store(keys[task[0]], chunk_output_path(task[0]))
+
+    # Many small units handed out as workers free up
+    run_ordered(process_range_pair_checked, todo, on_result=on_result)
+    return ([manifest['chunks'][str(task[0])]['bytes'] for task in manifest['tasks']],
+            [digests.get(task[0]) for task in manifest['tasks']])
 
 
 def main():
-    clean_dirs()
+    parser = argparse.ArgumentParser(description="Add hugefile1.txt and hugefile2.txt in parallel.")
+    parser.add_argument('--resume', action='store_true',
+                        help="keep the finished chunks of an interrupted run and redo only the rest")
+    parser.add_argument('--compressed', choices=sorted(CODECS),
+                        help="inputs are block-compressed (hugefile*.txt.gz/.xz, see blockcompress.py), "
+                             "the result is written the same way")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only add the rows appended to the inputs since the last --incremental run")
+    args = parser.parse_args()
+
+    if args.incremental:
+        start = time.time()
+        added, total, rebuilt = add_incremental(FILE1, FILE2, FINAL_OUTPUT, USE_NUMPY)
+        if rebuilt:
+            print(f"Rebuilt {FINAL_OUTPUT} from the start ({rebuilt})")
+        print(f"Done. Added {added} rows ({total} in total) in {time.time() - start:.2f} seconds")
+        return
+
+    if args.compressed:
+        extension = CODECS[args.compressed][0]
+        start = time.time()
+        print(f"Adding block-compressed {FILE1}{extension} and {FILE2}{extension} member by member...")
+        members = add_compressed(FILE1 + extension, FILE2 + extension, FINAL_OUTPUT + extension, args.compressed)
+        print(f"Done. Wrote {members} members to {FINAL_OUTPUT + extension} in {time.time() - start:.2f} seconds")
+        return
+
+    manifest = None
+    if args.resume and USE_BYTE_RANGES:
+        manifest = load_manifest(OUTPUT_DIR, [FILE1, FILE2])
+        if manifest is None:
+            print("No run manifest matching the current inputs, starting over.")
+    if manifest is None:
+        clean_dirs()
+
     start = time.time()
-    print(f"Splitting input files into {CHUNKS} parts...")
-    # Automatically choose best file splitting method depending on OS
-    p1 = Process(target=split_file_auto, args=(FILE1, SPLIT_DIR1))
-    p2 = Process(target=split_file_auto, args=(FILE2, SPLIT_DIR2))
-
-    p1.start()
-    p2.start()
-    p1.join()
-    p2.join()
+    chunks = CHUNKS
+    if manifest is not None:
+        print(f"Resuming with the byte ranges recorded in {manifest_path(OUTPUT_DIR)}")
+        chunks = len(manifest['tasks'])
+    elif USE_BYTE_RANGES:
+        # Only compute where each chunk starts, the inputs are never rewritten
+        units = CHUNKS
+        if ADAPTIVE_CHUNKS:
+            units = choose_task_count(os.path.getsize(FILE1) + os.path.getsize(FILE2))
+        print(f"Partitioning input files into {units} byte ranges...")
+        with tracing.stage('partition_pair', units=units):
+            tasks = partition_pair(FILE1, FILE2, units)
+        manifest = new_manifest([FILE1, FILE2], tasks)
+        chunks = len(tasks)
+    else:
+        print(f"Splitting input files into {CHUNKS} parts...")
+        # Automatically choose best file splitting method depending on OS
+        p1 = Process(target=split_file_auto, args=(FILE1, SPLIT_DIR1))
+        p2 = Process(target=split_file_auto, args=(FILE2, SPLIT_DIR2))
+
+        p1.start()
+        p2.start()
+        p1.join()
+        p2.join()
     end = time.time()
     print(f"Splitting took {end - start:.2f} seconds")
 
     p_start = time.time()
     print("Processing file chunks in parallel...")
-    parallel_process_file_pairs()
+    lengths = None
+    if USE_BYTE_RANGES:
+        lengths, digests = parallel_process_ranges(manifest)
+    else:
+        parallel_process_file_pairs()
     p_end = time.time()
     print(f"Processing took {p_end - p_start:.2f} seconds")
 
     c_start = time.time()
     print("Combining output files into final result...")
-    combine_outputs()
+    combine_outputs(chunks=chunks, lengths=lengths)
     final_end = time.time()
     print(f"Combining took {final_end - c_start:.2f} seconds")
+    if USE_BYTE_RANGES and WRITE_MANIFEST:
+        write_manifest(FILE1, FILE2, FINAL_OUTPUT, manifest['tasks'], lengths, digests)
+        print(f"Digest manifest written to {digest_path(FINAL_OUTPUT)} in {time.time() - final_end:.2f} seconds")
     print(f"\nTime after splitting = {final_end - p_start:.2f} seconds")
     print(f"Done. Total operations took {final_end - start:.2f} seconds")
     clean_dirs()
+    if USE_CACHE:
+        chunk_cache.evict()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,196 @@
+import numpy as np
+from partition import nth_newline
+import tracing
+
+READ_SIZE = 4 * 1024 * 1024  # bytes read from each input per block
+
+# Lines with more digits than this could overflow int64 once added, so they fall back to Python
+MAX_DIGITS = 18
+LIMIT = 10 ** MAX_DIGITS
+POW10 = 10 ** np.arange(MAX_DIGITS + 1, dtype=np.int64)
+
+
+def parse_lines(data):
+    """
+    Parses a buffer of newline-terminated integers in bulk.
+
+    Args:
+        data (bytes): Complete lines, the last one ending in b'\\n'.
+
+    Returns:
+        tuple: (values, valid) arrays with one entry per line. Blank and invalid lines
+            are marked invalid, matching the strip()/int() checks of the Python path.
+
+    Raises:
+        OverflowError: A line holds a number too large to add safely in int64.
+    """
+    raw = np.frombuffer(data, dtype=np.uint8)
+    newlines = np.flatnonzero(raw == 10)
+    count = len(newlines)
+    if count == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool)
+
+    starts = np.empty(count, dtype=np.int64)
+    starts[0] = 0
+    starts[1:] = newlines[:-1] + 1
+    lengths = newlines - starts
+
+    # Walk the lines right to left one digit column at a time, weighting by place value
+    values = np.zeros(count, dtype=np.int64)
+    invalid = lengths > MAX_DIGITS
+    for column in range(min(int(lengths.max()), MAX_DIGITS)):
+        in_line = lengths > column
+        digit = (raw[newlines - 1 - column] - np.uint8(48)).astype(np.int64)  # non-digits wrap to >= 10
+        invalid |= in_line & (digit >= 10)
+        values += np.where(in_line, digit, 0) * POW10[column]
+
+    valid = ~invalid & (lengths > 0)
+
+    # Rare lines with whitespace, signs or long digit runs go through int() like before
+    for i in np.flatnonzero(~valid & (lengths > 0)):
+        text = data[starts[i]:newlines[i]].strip()
+        if text:
+            try:
+                number = int(text)
+            except ValueError:
+                continue  # skip invalid lines
+            if not -LIMIT < number < LIMIT:
+                raise OverflowError(f"{number} does not fit the int64 kernel")
+            values[i] = number
+            valid[i] = True
+    return values, valid
+
+
+def format_ints(values):
+    """Formats an int64 array as newline-terminated decimal text in one buffer."""
+    if len(values) == 0:
+        return b''
+    if values.min() < 0:
+        return ('\n'.join(map(str, values.tolist())) + '\n').encode()
+
+    width = len(str(int(values.max())))
+    text = np.empty((len(values), width + 1), dtype=np.uint8)
+    text[:, width] = 10
+    remaining = values.copy()
+    for column in range(width - 1, -1, -1):
+        text[:, column] = remaining % 10 + 48
+        remaining //= 10
+
+    # Keep only each number's own digits (drop the leading zero padding)
+    num_digits = np.searchsorted(POW10[1:width], values, side='right') + 1
+    keep = np.arange(width + 1) >= (width - num_digits)[:, None]
+    return text[keep].tobytes()
+
+
+def aligned_blocks(files, line_count=None, read_size=READ_SIZE):
+    """
+    Reads the open binary files in large blocks, yielding one buffer per file that all
+    hold the same number of complete lines. Stops when the shortest file ends, like zip().
+
+    Args:
+        files (list): Binary file objects, already positioned at the first line.
+        line_count (int): Maximum number of lines to read, or None for everything.
+        read_size (int): Bytes read from each file per block.
+    """
+    buffers = [b''] * len(files)
+    finished = [False] * len(files)
+    remaining = line_count
+
+    while remaining is None or remaining > 0:
+        for i, f in enumerate(files):
+            # Top up only buffers that are running low, so short-line files don't pile up
+            if finished[i] or (len(buffers[i]) >= read_size and b'\n' in buffers[i]):
+                continue
+            block = f.read(read_size)
+            if block:
+                buffers[i] += block
+            else:
+                finished[i] = True
+                # The last line may not end in a newline
+                if buffers[i] and not buffers[i].endswith(b'\n'):
+                    buffers[i] += b'\n'
+
+        lines = min(buf.count(b'\n') for buf in buffers)
+        if remaining is not None:
+            lines = min(lines, remaining)
+        if lines == 0:
+            if any(finished[i] and not buffers[i] for i in range(len(files))):
+                return
+            continue
+
+        heads = []
+        for i, buf in enumerate(buffers):
+            cut = nth_newline(buf, lines) + 1
+            heads.append(buf[:cut])
+            buffers[i] = buf[cut:]
+        if remaining is not None:
+            remaining -= lines
+        yield heads
+
+
+def add_lines_python(block1, block2):
+    """Pure-Python fallback for blocks the int64 kernel can't represent."""
+    result = []
+    for line1, line2 in zip(block1.split(b'\n')[:-1], block2.split(b'\n')[:-1]):
+        val1 = line1.strip()
+        val2 = line2.strip()
+        if val1 and val2:
+            try:
+                result.append(f"{int(val1) + int(val2)}\n")
+            except ValueError:
+                tracing.count(invalid=1)
+                continue  # skip invalid lines
+        else:
+            tracing.count(blank=1)
+    return ''.join(result).encode()
+
+
+def add_blocks(block1, block2):
+    """Adds two buffers of complete lines row by row, returning the formatted sums."""
+    try:
+        values1, valid1 = parse_lines(block1)
+        values2, valid2 = parse_lines(block2)
+    except OverflowError:
+        return add_lines_python(block1, block2)
+    rows = min(len(values1), len(values2))  # like zip(), stop at the shorter block
+    keep = valid1[:rows] & valid2[:rows]
+    if tracing.ENABLED:
+        dropped = np.flatnonzero(~keep).tolist()
+        if dropped:
+            # Same split as the Python path: a row is blank if either side is, otherwise invalid
+            lines1, lines2 = block1.split(b'\n'), block2.split(b'\n')
+            blank = sum(1 for i in dropped if not lines1[i].strip() or not lines2[i].strip())
+            tracing.count(blank=blank, invalid=len(dropped) - blank)
+    return format_ints(values1[:rows][keep] + values2[:rows][keep])
+
+
+def add_files_numpy(input1, input2, output, start1=0, start2=0, line_count=None, digest=None):
+    """
+    Adds two files line by line with NumPy: parse a block, add it, write it in one call.
+
+    Args:
+        input1 (str): First input file.
+        input2 (str): Second input file.
+        output (str): File the sums are written to.
+        start1 (int): Byte offset to start reading input1 at.
+        start2 (int): Byte offset to start reading input2 at.
+        line_count (int): Number of lines to add, or None to run to the end.
+        digest (digest.ChunkDigest): Fed every input and output block while it is in memory.
+    """
+    with open(input1, 'rb') as f1, open(input2, 'rb') as f2, open(output, 'wb') as out:
+        f1.seek(start1)
+        f2.seek(start2)
+        for block1, block2 in aligned_blocks([f1, f2], line_count):
+            data = add_blocks(block1, block2)
+            out.write(data)
+            if digest is not None:
+                digest.add_inputs(block1, block2)
+                digest.add_output(data)
+        tracing.count(bytes_in=f1.tell() - start1 + f2.tell() - start2)
+    return output
+
+
+def add_range_pair_numpy(file1, file2, task, output_file, digest=None):
+    """NumPy version of partition.add_range_pair for one byte-range chunk."""
+    index, start1, start2, line_count = task
+    return add_files_numpy(file1, file2, output_file, start1, start2, line_count, digest)
@@ -0,0 +1,190 @@
+from itertools import islice
+import tracing
+
+BLOCK_SIZE = 16 * 1024 * 1024  # bytes read per pass when scanning for newlines
+DIGEST_ROWS = 65536  # add_range_pair: rows handed to the digest at a time
+
+
+# Count lines by scanning raw bytes for newlines (a trailing line without '\n' still counts)
+def count_lines(file_path):
+    total = 0
+    last = b'\n'
+    with open(file_path, 'rb') as f:
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                break
+            total += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        total += 1
+    return total
+
+
+def nth_newline(block, n, start=0):
+    """
+    Returns the position of the n-th newline (1-based) in block at or after start, or -1.
+    Whole windows are skipped with bytes.count so only the last window is walked with find.
+    """
+    window = 65536
+    pos = start
+    while n > 0:
+        end = pos + window
+        if end >= len(block):
+            break
+        in_window = block.count(b'\n', pos, end)
+        if in_window >= n:
+            break
+        n -= in_window
+        pos = end
+    found = pos - 1
+    for _ in range(n):
+        found = block.find(b'\n', found + 1)
+        if found == -1:
+            return -1
+    return found
+
+
+def find_line_offsets(file_path, line_numbers, start=0):
+    """
+    Finds the byte offset where each requested line starts.
+
+    Args:
+        file_path (str): File to scan.
+        line_numbers (list): Zero-based line numbers, in ascending order.
+        start (int): Byte offset of line 0 (a line start), to scan only the rest of the file.
+
+    Returns:
+        list: Byte offset for each line number. Lines past the end map to the file size.
+    """
+    offsets = []
+    targets = iter(line_numbers)
+    target = next(targets, None)
+    lines_seen = 0
+    block_start = start
+
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        while target is not None:
+            # Line 0 (and any line we already sit on) starts at the current block
+            if target == lines_seen:
+                offsets.append(block_start)
+                target = next(targets, None)
+                continue
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                break
+            newlines = block.count(b'\n')
+            pos = -1
+            found = 0
+            # Walk forward inside the block for every target that ends up here
+            while target is not None and target <= lines_seen + newlines:
+                if target - lines_seen > found:
+                    pos = nth_newline(block, target - lines_seen - found, pos + 1)
+                found = target - lines_seen
+                offsets.append(block_start + pos + 1)
+                target = next(targets, None)
+            lines_seen += newlines
+            block_start += len(block)
+
+    # Anything left over is past the end of the file
+    while target is not None:
+        offsets.append(block_start)
+        target = next(targets, None)
+    return offsets
+
+
+def chunk_line_starts(total_lines, chunks):
+    """Returns the first line number of every chunk, using ceiling division like split -l."""
+    lines_per_chunk = max(1, (total_lines + chunks - 1) // chunks)
+    return list(range(0, max(total_lines, 1), lines_per_chunk)), lines_per_chunk
+
+
+def partition_files(file_paths, chunks, total_lines=None, use_index=True):
+    """
+    Computes newline-aligned byte ranges so chunk i of every file covers the same lines.
+    Nothing is copied - each worker seeks straight into the original files.
+
+    Args:
+        file_paths (list): Files that line up row for row.
+        chunks (int): Number of partitions.
+        total_lines (int): Line count if already known, otherwise counted from the first file.
+        use_index (bool): Use (and create if missing) the .idx sidecar of each file,
+            so repeated runs skip the counting and scanning passes.
+
+    Returns:
+        list: One (index, start_offsets, line_count) tuple per chunk.
+    """
+    if use_index:
+        from line_index import get_index  # imported here, line_index builds on this module
+        indexes = [get_index(path) for path in file_paths]
+        if total_lines is None:
+            total_lines = indexes[0].total_lines
+        starts, lines_per_chunk = chunk_line_starts(total_lines, chunks)
+        offsets = [[index.line_offset(path, line) for line in starts]
+                   for index, path in zip(indexes, file_paths)]
+    else:
+        if total_lines is None:
+            total_lines = count_lines(file_paths[0])
+        starts, lines_per_chunk = chunk_line_starts(total_lines, chunks)
+        offsets = [find_line_offsets(path, starts) for path in file_paths]
+
+    tasks = []
+    for index, first_line in enumerate(starts):
+        line_count = min(lines_per_chunk, total_lines - first_line)
+        tasks.append((index, tuple(o[index] for o in offsets), line_count))
+    return tasks
+
+
+def partition_pair(file1, file2, chunks):
+    """Byte-range partitions for two aligned files: (index, start1, start2, line_count)."""
+    return [(index, starts[0], starts[1], line_count)
+            for index, starts, line_count in partition_files([file1, file2], chunks)]
+
+
+def _feed_digest(digest, lines1, lines2, written):
+    """Hands a batch of input lines and the output they gave to a digest.ChunkDigest, then empties the batch."""
+    block1, block2 = b''.join(lines1), b''.join(lines2)
+    # Only the last line of a file can lack its newline
+    digest.add_inputs(block1 if block1.endswith(b'\n') else block1 + b'\n',
+                      block2 if block2.endswith(b'\n') else block2 + b'\n')
+    digest.add_output(''.join(written).encode())
+    del lines1[:], lines2[:], written[:]
+
+
+def add_range_pair(file1, file2, task, output_file, digest=None):
+    """
+    Adds one chunk of two files read directly from their byte offsets, write output.
+    A digest.ChunkDigest passed as digest is fed the lines while they are in memory.
+    """
+    index, start1, start2, line_count = task
+    lines1, lines2, written = [], [], []
+
+    # newline='\n' so the bytes on disk are the ones the digest saw, on Windows too
+    with open(file1, 'rb') as f1, open(file2, 'rb') as f2, open(output_file, 'w', newline='\n') as out:
+        f1.seek(start1)
+        f2.seek(start2)
+        for line1, line2 in islice(zip(f1, f2), line_count):
+            if digest is not None:
+                lines1.append(line1)
+                lines2.append(line2)
+                if len(lines1) == DIGEST_ROWS:
+                    _feed_digest(digest, lines1, lines2, written)
+            val1 = line1.strip()
+            val2 = line2.strip()
+            if val1 and val2:
+                try:
+                    result = f"{int(val1) + int(val2)}\n"
+                    out.write(result)
+                    if digest is not None:
+                        written.append(result)
+                except ValueError:
+                    tracing.count(invalid=1)
+                    continue  # skip invalid lines
+            else:
+                tracing.count(blank=1)
+        if digest is not None and lines1:
+            _feed_digest(digest, lines1, lines2, written)
+        tracing.count(bytes_in=f1.tell() - start1 + f2.tell() - start2)
+
+    return output_file
@@ -4,6 +4,7 @@ import time
 # simple script to generate a file - For the portfolio project it can be run twice
 # Name one file hugefile1.txt and the other file hugefile2.txt
 # Note that this may take around 5 minutes to generate 1 billion rows
+# generate_numbers.py does the same in parallel and reproducibly (--seed)
 file = open("./hugefile1.txt", "w")
 start_time = time.time()
 for i in range(1_000_000_000):
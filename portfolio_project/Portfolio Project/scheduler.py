@@ -0,0 +1,48 @@
+import math
+from multiprocessing import Pool, cpu_count
+
+TARGET_TASK_SECONDS = 2.0  # how long one work unit should take
+BYTES_PER_SECOND = 16 * 1024 * 1024  # rough input rate of one worker on the pure-Python add path
+TASKS_PER_WORKER = 4  # never fewer than this many units per worker, so a slow one can't hold up the end
+MAX_TASKS = 10000
+
+
+def choose_task_count(input_bytes, workers=None, target_seconds=TARGET_TASK_SECONDS,
+                      bytes_per_second=BYTES_PER_SECOND):
+    """
+    Picks how many work units to cut the input into, instead of a hand-tuned CHUNKS.
+
+    Args:
+        input_bytes (int): Bytes every unit reads in total (sum over all input files).
+        workers (int): Worker processes, defaults to cpu_count().
+        target_seconds (float): Desired duration of one unit.
+        bytes_per_second (float): Expected throughput of one worker.
+
+    Returns:
+        int: Number of units, at least TASKS_PER_WORKER per worker.
+    """
+    workers = workers or cpu_count()
+    by_duration = math.ceil(input_bytes / (bytes_per_second * target_seconds))
+    return max(1, min(MAX_TASKS, max(workers * TASKS_PER_WORKER, by_duration)))
+
+
+def _call_indexed(args):
+    func, index, task = args
+    return index, func(task)
+
+
+def run_ordered(func, tasks, workers=None, on_result=None):
+    """
+    Runs func over many small tasks with imap_unordered, so an idle worker always picks up
+    the next unit, then returns the results in task order for reassembly.
+    on_result(task, result) is called in the parent as each task finishes.
+    """
+    workers = min(workers or cpu_count(), max(1, len(tasks)))
+    results = [None] * len(tasks)
+    with Pool(processes=workers) as pool:
+        jobs = [(func, index, task) for index, task in enumerate(tasks)]
+        for index, result in pool.imap_unordered(_call_indexed, jobs):
+            results[index] = result
+            if on_result is not None:
+                on_result(tasks[index], result)
+    return results
@@ -0,0 +1,201 @@
+import os
+import sys
+import json
+import time
+import cProfile
+import argparse
+import functools
+import threading
+from collections import defaultdict
+
+# Everything is driven by environment variables so pool workers pick the settings up too:
+#   CSC507_TRACE=trace.jsonl   one JSON line per finished stage (Chrome trace event fields)
+#   CSC507_PROFILE=profiles/   cProfile stats of every worker stage that asks for profiling
+TRACE_PATH = os.environ.get('CSC507_TRACE')
+PROFILE_DIR = os.environ.get('CSC507_PROFILE')
+ENABLED = bool(TRACE_PATH or PROFILE_DIR)
+
+_stack = []  # stages open in this process, innermost last
+_trace_fd = (None, None)  # (pid, fd): reopened after a fork so every worker appends on its own
+_profiling = False
+
+# Counters summed per stage by summarize(); skipped = valid lines a stage drops on purpose
+COUNTERS = ('bytes_in', 'bytes_out', 'lines_in', 'lines_out', 'blank', 'invalid', 'skipped')
+
+
+class Span:
+    """One timed stage: monotonic start/end, fixed fields and counters added while it runs."""
+
+    def __init__(self, name, fields, profile=False):
+        self.name = name
+        self.fields = fields
+        self.counts = {}
+        self.profiler = None
+        self.profile = profile
+
+    def add(self, **counts):
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+
+    def __enter__(self):
+        global _profiling
+        if self.profile and PROFILE_DIR and not _profiling:
+            _profiling = True
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        _stack.append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _profiling
+        end = time.perf_counter_ns()
+        _stack.pop()
+        if self.profiler is not None:
+            self.profiler.disable()
+            _profiling = False
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            self.profiler.dump_stats(os.path.join(PROFILE_DIR, f"{self.name}-{os.getpid()}-{self.start}.prof"))
+        if exc_type is not None:
+            self.fields['error'] = f"{exc_type.__name__}: {exc}"
+        if TRACE_PATH:
+            _emit(self, end)
+        return False
+
+
+class _NullSpan:
+    """What stage() hands out when tracing is off: entering and adding do nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def add(self, **counts):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+def _emit(span, end):
+    global _trace_fd
+    pid, fd = _trace_fd
+    if pid != os.getpid():
+        fd = os.open(TRACE_PATH, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        _trace_fd = (os.getpid(), fd)
+    record = {
+        'name': span.name,
+        'ph': 'X',
+        'ts': span.start / 1000,  # microseconds, as Chrome expects
+        'dur': (end - span.start) / 1000,
+        'pid': os.getpid(),
+        'tid': threading.get_native_id(),
+        'args': dict(span.fields, **span.counts),
+    }
+    # One O_APPEND write per record, so lines from different workers don't interleave
+    os.write(fd, (json.dumps(record) + '\n').encode())
+
+
+def stage(name, profile=False, **fields):
+    """
+    Context manager timing one stage of a pipeline. Keyword fields (chunk=3, ...) go into the
+    trace as they are; counters are added on the returned span or through count().
+    profile=True also runs cProfile over it when CSC507_PROFILE is set.
+    """
+    if not ENABLED:
+        return NULL_SPAN
+    return Span(name, fields, profile)
+
+
+def traced(name=None, profile=False):
+    """Decorator form of stage(). With tracing off the function is returned untouched."""
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name or func.__name__, profile):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(**counts):
+    """Adds counters (invalid=1, ...) to the innermost open stage; a no-op when nothing is traced."""
+    if _stack:
+        _stack[-1].add(**counts)
+
+
+def annotate(**fields):
+    """Sets fields (chunk=index, ...) on the innermost open stage."""
+    if _stack:
+        _stack[-1].fields.update(fields)
+
+
+def record_output(path, inputs=()):
+    """
+    Adds bytes_out/lines_out of a finished output file and bytes_in of its inputs to the open
+    stage. lines_in is lines_out plus the blank, invalid and skipped lines counted on the way.
+    Nothing is read unless a trace is being written.
+    """
+    if not _stack or not TRACE_PATH:
+        return
+    from partition import count_lines
+    span = _stack[-1]
+    lines_out = count_lines(path)
+    span.add(bytes_out=os.path.getsize(path), lines_out=lines_out,
+             lines_in=lines_out + sum(span.counts.get(key, 0) for key in ('blank', 'invalid', 'skipped')))
+    if inputs:
+        span.add(bytes_in=sum(os.path.getsize(p) for p in inputs))
+
+
+def load_trace(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def to_chrome(trace_path, chrome_path):
+    """Wraps the JSON-lines trace into a file chrome://tracing and Perfetto open directly."""
+    with open(chrome_path, 'w') as f:
+        json.dump({'traceEvents': load_trace(trace_path), 'displayTimeUnit': 'ms'}, f)
+
+
+def summarize(records):
+    """Per stage: calls, total/max seconds and the sum of every counter."""
+    stages = defaultdict(lambda: {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'counts': defaultdict(int)})
+    for record in records:
+        summary = stages[record['name']]
+        seconds = record['dur'] / 1e6
+        summary['calls'] += 1
+        summary['seconds'] += seconds
+        summary['max_seconds'] = max(summary['max_seconds'], seconds)
+        for key in COUNTERS:
+            if key in record['args']:
+                summary['counts'][key] += record['args'][key]
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a CSC507_TRACE file or convert it for chrome://tracing.")
+    parser.add_argument('trace')
+    parser.add_argument('--chrome', help="also write a Chrome trace JSON file here")
+    args = parser.parse_args()
+
+    records = load_trace(args.trace)
+    for name, summary in sorted(summarize(records).items(), key=lambda item: -item[1]['seconds']):
+        counts = ', '.join(f"{key}={value:,}" for key, value in sorted(summary['counts'].items()))
+        print(f"{name:<28}{summary['calls']:>6} calls {summary['seconds']:>10.3f}s total "
+              f"{summary['max_seconds']:>9.3f}s max  {counts}")
+    slowest = max(records, key=lambda record: record['dur'], default=None)
+    if slowest is not None:
+        print(f"\nSlowest: {slowest['name']} {slowest['args']} in pid {slowest['pid']}, {slowest['dur'] / 1e6:.3f}s")
+    if args.chrome:
+        to_chrome(args.trace, args.chrome)
+        print(f"Chrome trace written to {args.chrome}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
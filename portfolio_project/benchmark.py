@@ -0,0 +1,269 @@
+import os
+import sys
+import json
+import time
+import fnmatch
+import argparse
+import platform
+import tempfile
+import importlib
+import importlib.util
+import subprocess
+import contextlib
+import multiprocessing
+
+try:
+    import resource  # not available on Windows, peak RSS is then reported as null
+except ImportError:
+    resource = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MILESTONES = os.path.join(HERE, 'Portfolio Milestones')
+PROJECT = os.path.join(HERE, 'Portfolio Project')
+
+# Inputs are laid out the way the scripts expect them:
+#   <work>/file2.txt, hugefile1.txt, hugefile2.txt   (scripts that read files in their own directory)
+#   <work>/run/                                       (milestone scripts that read ../file2.txt)
+SINGLE_INPUT = ['file2.txt']
+PAIR_INPUT = ['hugefile1.txt', 'hugefile2.txt']
+SETTINGS_VARIABLE = 'CSC507_BENCH_SETTINGS'  # module constants of the running case, seen by its workers too
+
+
+class Case:
+    """One benchmarked strategy: how to call it, where to run it and which inputs it reads."""
+
+    def __init__(self, name, module, run, inputs, subdir='', uses_chunks=False, needs=()):
+        self.name = name
+        self.module = module
+        self.run = run
+        self.inputs = inputs
+        self.subdir = subdir
+        self.uses_chunks = uses_chunks
+        self.needs = needs
+
+
+CASES = {}
+
+
+def register(name, module, run, inputs, **kwargs):
+    CASES[name] = Case(name, module, run, inputs, **kwargs)
+
+
+def _apply_settings():
+    """
+    Sets the module constants recorded in CSC507_BENCH_SETTINGS. Pool workers started with
+    spawn (Windows, macOS) re-import the script module with its defaults, but they import this
+    file as their __main__ first, which calls this again with the inherited environment.
+    """
+    settings = json.loads(os.environ.get(SETTINGS_VARIABLE, '{}'))
+    for module_name, values in settings.items():
+        module = importlib.import_module(module_name)
+        for key, value in values.items():
+            setattr(module, key, value)
+
+
+def configure(module, **values):
+    """Sets constants of module in this process and in every worker it starts."""
+    settings = json.loads(os.environ.get(SETTINGS_VARIABLE, '{}'))
+    settings.setdefault(module.__name__, {}).update(values)
+    os.environ[SETTINGS_VARIABLE] = json.dumps(settings)
+    _apply_settings()
+
+
+def _set(**values):
+    """Case runner that sets module constants, then calls main()."""
+    def run(module):
+        configure(module, **values)
+        module.main()
+    return run
+
+
+for _module, _prefix in [('double_pynumbers', 'double'), ('heavy_cpu_load_numbers', 'heavy')]:
+    for _method in ['read_all', 'line_by_line', 'split_file']:
+        register(f'{_prefix}.{_method}', _module, lambda m, f=_method: getattr(m, f)(),
+                 SINGLE_INPUT, subdir='run')
+
+register('one_large.whole_file', 'multiprocess_one_large', lambda m: m.parallel_process_file(chunks=m.CHUNKS),
+         SINGLE_INPUT, uses_chunks=True)
+register('one_large.streaming', 'multiprocess_one_large', lambda m: m.stream_process_file(), SINGLE_INPUT)
+register('one_large.shared_memory', 'multiprocess_one_large', lambda m: m.shm_process_file(), SINGLE_INPUT)
+register('splitting_file', 'multiprocess_splitting_file', _set(), SINGLE_INPUT, subdir='run', uses_chunks=True)
+register('add_files_streaming.python', 'add_files_streaming',
+         lambda m: m.add_files_streaming('hugefile1.txt', 'hugefile2.txt', 'summation.txt'), PAIR_INPUT)
+register('add_files_streaming.numpy', 'add_files_streaming',
+         lambda m: m.add_files_numpy('hugefile1.txt', 'hugefile2.txt', 'summation.txt'), PAIR_INPUT, needs=['numpy'])
+register('add_files_streaming.mmap', 'add_files_streaming',
+         lambda m: m.add_files_mmap('hugefile1.txt', 'hugefile2.txt', 'summation.txt'), PAIR_INPUT)
+register('multi_add.split', 'multi_add', _set(USE_BYTE_RANGES=False), PAIR_INPUT, uses_chunks=True)
+register('multi_add.ranges', 'multi_add',
+         _set(USE_BYTE_RANGES=True, USE_NUMPY=False, ADAPTIVE_CHUNKS=False, WRITE_MANIFEST=False),
+         PAIR_INPUT, uses_chunks=True)
+register('multi_add.ranges_numpy', 'multi_add',
+         _set(USE_BYTE_RANGES=True, USE_NUMPY=True, ADAPTIVE_CHUNKS=False, WRITE_MANIFEST=False),
+         PAIR_INPUT, uses_chunks=True, needs=['numpy'])
+register('multi_add.ranges_adaptive', 'multi_add',
+         _set(USE_BYTE_RANGES=True, USE_NUMPY=False, ADAPTIVE_CHUNKS=True, WRITE_MANIFEST=False), PAIR_INPUT)
+register('multi_add.ranges_manifest', 'multi_add',
+         _set(USE_BYTE_RANGES=True, USE_NUMPY=False, ADAPTIVE_CHUNKS=True, WRITE_MANIFEST=True), PAIR_INPUT)
+# The warmup run fills .chunk_cache in the workdir, so this times reruns over unchanged inputs
+register('multi_add.ranges_cached', 'multi_add',
+         _set(USE_BYTE_RANGES=True, USE_NUMPY=False, ADAPTIVE_CHUNKS=True, WRITE_MANIFEST=False, USE_CACHE=True),
+         PAIR_INPUT)
+register('multi_add_improved.split', 'multi_add_improved', _set(USE_BYTE_RANGES=False), PAIR_INPUT,
+         uses_chunks=True, needs=['filesplit'])
+register('multi_add_improved.ranges', 'multi_add_improved',
+         _set(USE_BYTE_RANGES=True, ADAPTIVE_CHUNKS=False, WRITE_MANIFEST=False),
+         PAIR_INPUT, uses_chunks=True, needs=['filesplit'])
+register('multi_add_improved.ranges_adaptive', 'multi_add_improved',
+         _set(USE_BYTE_RANGES=True, ADAPTIVE_CHUNKS=True, WRITE_MANIFEST=False), PAIR_INPUT, needs=['filesplit'])
+
+
+def available(case):
+    for package in case.needs:
+        if importlib.util.find_spec(package) is None:
+            return False
+    return True
+
+
+def peak_rss_mb():
+    """Largest resident set of this process or any finished child (pool workers), in MB."""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if platform.system() == 'Darwin' else peak / 1024
+
+
+def run_case(name, workdir, chunks, start_method=None):
+    """Runs one case once in this (fresh) process and prints its measurements as JSON."""
+    case = CASES[name]
+    if start_method:
+        multiprocessing.set_start_method(start_method)
+    sys.path[:0] = [MILESTONES, PROJECT]
+    module = importlib.import_module(case.module)
+    if chunks is not None:
+        configure(module, CHUNKS=chunks)
+
+    os.chdir(os.path.join(workdir, case.subdir))
+    sys.argv = [case.module]  # scripts that parse arguments in main() see no options
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        case.run(module)
+        seconds = time.perf_counter() - start
+    print(json.dumps({'seconds': seconds, 'peak_rss_mb': peak_rss_mb()}))
+
+
+def make_inputs(workdir, lines, seed):
+    """Generates every input file once with generate_numbers.py (same seed, same data)."""
+    os.makedirs(os.path.join(workdir, 'run'), exist_ok=True)
+    for offset, name in enumerate(SINGLE_INPUT + PAIR_INPUT):
+        subprocess.run([sys.executable, os.path.join(PROJECT, 'generate_numbers.py'),
+                        os.path.join(workdir, name), '--rows', str(lines), '--seed', str(seed + offset)],
+                       check=True, stdout=subprocess.DEVNULL)
+
+
+def measure(name, workdir, chunks, start_method=None):
+    command = [sys.executable, os.path.abspath(__file__), '--run-case', name, '--workdir', workdir]
+    if chunks is not None:
+        command += ['--chunks', str(chunks)]
+    if start_method:
+        command += ['--start-method', start_method]
+    result = subprocess.run(command, check=True, capture_output=True, text=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=HERE, capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every file-processing strategy in the repo.")
+    parser.add_argument('--lines', type=int, default=1_000_000, help="rows per generated input file")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--cases', nargs='*', default=['*'], help="case names or glob patterns")
+    parser.add_argument('--chunks', type=int, nargs='*', default=[None],
+                        help="CHUNKS values to try for chunked cases (default: each script's own)")
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workdir', default=None, help="where inputs are generated (default: a temp dir)")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--list', action='store_true', help="list the registered cases and exit")
+    parser.add_argument('--start-method', choices=multiprocessing.get_all_start_methods(),
+                        help="multiprocessing start method of the cases (default: the platform's)")
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        run_case(args.run_case, args.workdir, args.chunks[0], args.start_method)
+        return
+    if args.list:
+        for case in CASES.values():
+            print(f"{case.name}{'' if available(case) else '  (skipped: needs ' + ', '.join(case.needs) + ')'}")
+        return
+
+    names = [name for name in CASES if any(fnmatch.fnmatch(name, pattern) for pattern in args.cases)]
+    workdir = args.workdir or tempfile.mkdtemp(prefix='csc507_bench_')
+    print(f"Generating {args.lines} lines per input in {workdir} ...")
+    make_inputs(workdir, args.lines, args.seed)
+
+    results = []
+    for name in names:
+        case = CASES[name]
+        if not available(case):
+            print(f"{name}: skipped, needs {', '.join(case.needs)}")
+            continue
+        input_bytes = sum(os.path.getsize(os.path.join(workdir, f)) for f in case.inputs)
+        for chunks in (args.chunks if case.uses_chunks else [None]):
+            for _ in range(args.warmup):
+                measure(name, workdir, chunks, args.start_method)
+            runs = [measure(name, workdir, chunks, args.start_method) for _ in range(args.repeat)]
+            seconds = [run['seconds'] for run in runs]
+            median = percentile(seconds, 50)
+            rss = [run['peak_rss_mb'] for run in runs if run['peak_rss_mb'] is not None]
+            result = {
+                'case': name,
+                'chunks': chunks,
+                'seconds': seconds,
+                'median_s': median,
+                'p95_s': percentile(seconds, 95),
+                'lines_per_s': args.lines / median,
+                'mb_per_s': input_bytes / (1024 * 1024) / median,
+                'peak_rss_mb': max(rss) if rss else None,
+            }
+            results.append(result)
+            label = name if chunks is None else f"{name} (CHUNKS={chunks})"
+            peak = 'n/a' if result['peak_rss_mb'] is None else f"{result['peak_rss_mb']:.1f} MB"
+            print(f"{label}: median {median:.3f}s, p95 {result['p95_s']:.3f}s, "
+                  f"{result['lines_per_s']:,.0f} lines/s, {result['mb_per_s']:.1f} MB/s, peak RSS {peak}")
+
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'lines': args.lines,
+        'warmup': args.warmup,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
+elif __name__ == '__mp_main__':
+    _apply_settings()  # a spawned pool worker of a running case